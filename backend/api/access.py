@@ -0,0 +1,107 @@
+"""
+Who may see what, resolved once per request.
+
+An AccessContext holds the caller's role, profile id, the child ids they
+may see and the parent ids whose rewards they may use. Permission classes,
+queryset filters and serializers all ask the request's context (see
+get_access) instead of running their own membership queries.
+
+Claims-bearing tokens (api/authentication.py) already carry the child ids;
+everything else is loaded from the database at most once per request and
+cached for ACCESS_CONTEXT_CACHE_TIMEOUT seconds under the user's
+access_version, so a Child.parents change never serves stale sets.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from .authentication import VERSION_CLAIM, ClaimsUser, access_claims
+from .models import Parent
+
+ACCESS_CACHE_KEY = 'access-context:user:{}:v{}:{}'
+
+
+class AccessContext:
+    def __init__(self, user):
+        self.user = user
+        self.user_id = user.pk if user.is_authenticated else None
+        self.role = getattr(user, 'role', None) if user.is_authenticated else None
+        if isinstance(user, ClaimsUser):
+            self.version = user.token[VERSION_CLAIM]
+            self._claims = {
+                'parent_id': user.parent_id,
+                'child_id': user.child_id,
+                'child_ids': user.child_ids,
+            }
+        else:
+            self.version = getattr(user, 'access_version', None)
+
+    def _cached(self, name, compute):
+        timeout = getattr(settings, 'ACCESS_CONTEXT_CACHE_TIMEOUT', 60)
+        if not timeout or self.version is None:
+            return compute()
+        key = ACCESS_CACHE_KEY.format(self.user_id, self.version, name)
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.set(key, value, timeout)
+        return value
+
+    @cached_property
+    def _claims(self):
+        if self.role not in ('parent', 'child'):
+            return {'parent_id': None, 'child_id': None, 'child_ids': frozenset()}
+        claims = self._cached('claims', lambda: access_claims(self.user))
+        return {
+            'parent_id': claims['parent_id'],
+            'child_id': claims['child_id'],
+            'child_ids': frozenset(claims['child_ids']),
+        }
+
+    @property
+    def is_parent(self):
+        return self.role == 'parent'
+
+    @property
+    def is_child(self):
+        return self.role == 'child'
+
+    @property
+    def parent_id(self):
+        """The caller's Parent id, if they are a parent."""
+        return self._claims['parent_id']
+
+    @property
+    def child_id(self):
+        """The caller's Child id, if they are a child."""
+        return self._claims['child_id']
+
+    @property
+    def child_ids(self):
+        """Children the caller may see: their own children, or themself."""
+        return self._claims['child_ids']
+
+    @cached_property
+    def parent_ids(self):
+        """Parents whose rewards the caller may see: themself, or their parents."""
+        if self.is_parent:
+            return frozenset([self.parent_id] if self.parent_id is not None else [])
+        if self.is_child:
+            return frozenset(self._cached('parents', lambda: sorted(
+                Parent.objects.filter(children=self.child_id).values_list('pk', flat=True)
+            )))
+        return frozenset()
+
+    def can_see_child(self, child_id):
+        return child_id in self.child_ids
+
+
+def get_access(request):
+    """The AccessContext of `request` (DRF or Django), built on first use."""
+    user = request.user
+    # Kept on the HttpRequest, so everything handling the request shares it
+    holder = getattr(request, '_request', request)
+    context = getattr(holder, '_access_context', None)
+    if context is None or context.user is not user:
+        context = holder._access_context = AccessContext(user)
+    return context
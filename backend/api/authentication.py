@@ -0,0 +1,176 @@
+"""
+Stateless JWT authorization.
+
+Access tokens carry the caller's role, profile id and the set of children
+they may see, so authenticating a request and scoping its querysets needs
+no database queries. Each token is stamped with the user's access_version;
+anything that changes who may see whom (Child.parents links, see
+api/signals.py) bumps it, and tokens with an older stamp are rejected until
+the client refreshes them. The current version is read from the cache and
+only falls back to the database on a miss.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .models import Child, Parent
+
+ACCESS_VERSION_KEY = 'access-version:user:{}'
+ACCESS_VERSION_TIMEOUT = 24 * 60 * 60
+VERSION_CLAIM = 'ver'
+
+
+def access_claims(user):
+    """The authorization claims embedded in `user`'s tokens."""
+    claims = {
+        'username': user.username,
+        'role': user.role,
+        'parent_id': None,
+        'child_id': None,
+        'child_ids': [],
+        VERSION_CLAIM: user.access_version,
+    }
+    if user.role == 'parent':
+        parent_id = Parent.objects.filter(user_id=user.pk).values_list('pk', flat=True).first()
+        claims['parent_id'] = parent_id
+        claims['child_ids'] = sorted(
+            Child.parents.through.objects.filter(parent_id=parent_id).values_list('child_id', flat=True)
+        )
+    elif user.role == 'child':
+        child_id = Child.objects.filter(user_id=user.pk).values_list('pk', flat=True).first()
+        claims['child_id'] = child_id
+        claims['child_ids'] = [child_id] if child_id is not None else []
+    return claims
+
+
+def current_access_version(user_id):
+    """`user_id`'s access_version, or None if the user is gone or inactive."""
+    key = ACCESS_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            get_user_model().objects.filter(pk=user_id, is_active=True)
+            .values_list('access_version', flat=True).first()
+        )
+        if version is None:
+            return None
+        cache.set(key, version, ACCESS_VERSION_TIMEOUT)
+    return version
+
+
+def bump_access_versions(user_ids):
+    """Invalidate the outstanding access tokens of `user_ids`."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    get_user_model().objects.filter(pk__in=user_ids).update(access_version=F('access_version') + 1)
+    forget_access_versions(user_ids)
+
+
+def forget_access_versions(user_ids):
+    """
+    Drop the cached versions of `user_ids`, so their next request re-reads
+    the version and is_active from the database.
+    """
+    # Dropped on commit: before it, a concurrent reader could re-cache the old value
+    keys = [ACCESS_VERSION_KEY.format(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class ClaimsUser(TokenUser):
+    """request.user for claims-bearing tokens: no database row behind it."""
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', '')
+
+    @cached_property
+    def parent_id(self):
+        return self.token.get('parent_id')
+
+    @cached_property
+    def child_id(self):
+        return self.token.get('child_id')
+
+    @cached_property
+    def child_ids(self):
+        return frozenset(self.token.get('child_ids', ()))
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in access_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Re-reads the claims on refresh, which is how a stale token is renewed."""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        user_id = RefreshToken(attrs['refresh'])[api_settings.USER_ID_CLAIM]
+        user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('User not found or inactive.', code='user_not_found')
+        access = AccessToken(data['access'])
+        for claim, value in access_claims(user).items():
+            access[claim] = value
+        data['access'] = str(access)
+        return data
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT auth that trusts the token's claims instead of loading the User.
+    Tokens issued without claims are upgraded from the database on each use.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        if VERSION_CLAIM not in validated_token:
+            user = super().get_user(validated_token)
+            for claim, value in access_claims(user).items():
+                validated_token[claim] = value
+            return ClaimsUser(validated_token)
+
+        version = current_access_version(user_id)
+        if version is None:
+            raise AuthenticationFailed('User not found or inactive.', code='user_not_found')
+        if validated_token[VERSION_CLAIM] != version:
+            raise InvalidToken('Token access claims are out of date; refresh it.')
+        return ClaimsUser(validated_token)
+
+
+class QueryParamJWTAuthentication(ClaimsJWTAuthentication):
+    """
+    JWT auth that also accepts the access token as ?token=, for EventSource
+    clients, which cannot set an Authorization header. Only use it on
+    streaming endpoints: tokens in URLs end up in access logs.
+    """
+    query_param = 'token'
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            return result
+        raw_token = request.query_params.get(self.query_param)
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_user(validated_token), validated_token
@@ -0,0 +1,49 @@
+"""
+Reward catalog cache.
+
+Catalogs are cached as serialized payloads per parent; whose catalogs a user
+sees comes from their AccessContext (api/access.py). A warm hit is one
+cache round-trip and no database queries. Entries are dropped by the signal
+handlers in api/signals.py whenever a Reward or its parent's user changes.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Reward
+from .routing import primary
+
+CATALOG_KEY = 'reward-catalog:parent:{}'
+
+
+def _timeout():
+    return getattr(settings, 'REWARD_CATALOG_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def reward_catalog(parent_ids):
+    """Rewards of `parent_ids` (see AccessContext.parent_ids), serialized, ordered by id."""
+    from .projections import REWARD
+
+    keys = {CATALOG_KEY.format(parent_id): parent_id for parent_id in parent_ids}
+    cached = cache.get_many(keys)
+
+    missing = [parent_id for key, parent_id in keys.items() if key not in cached]
+    if missing:
+        rewards = Reward.objects.filter(parent_id__in=missing).order_by('pk')
+        fresh = {CATALOG_KEY.format(parent_id): [] for parent_id in missing}
+        # Cached for everyone: never fill it from a lagging replica
+        with primary():
+            items = REWARD.list(rewards, list(REWARD.fields))
+        for item in items:
+            fresh[CATALOG_KEY.format(item['parent']['id'])].append(item)
+        cache.set_many(fresh, _timeout())
+        cached.update(fresh)
+
+    return sorted((item for payload in cached.values() for item in payload), key=lambda item: item['id'])
+
+
+def invalidate_parent_catalogs(parent_ids):
+    # Once the rewards are committed; until then a catalog read would re-cache the old ones
+    keys = [CATALOG_KEY.format(parent_id) for parent_id in parent_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
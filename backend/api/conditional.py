@@ -0,0 +1,156 @@
+"""
+Conditional GETs for the read endpoints.
+
+Every response is validated by a handful of change versions kept in the
+cache, one per scope a response can depend on:
+  - parent:<id>   a parent's family: their rewards, children and those
+                  children's ledgers, requests and parents
+  - child:<id>    one child's own data
+  - user:<id>     the caller's account
+  - parents       the parent directory (ParentViewSet)
+Writes bump the versions of every scope they touch (see api/signals.py),
+after commit. Reading the versions is one cache round-trip, so a request
+whose If-None-Match still matches gets its 304 before any view query or
+serializer runs.
+
+A version is the time_ns() of the last write rather than a counter, so a
+version lost to eviction comes back as a fresh value instead of restarting
+at one and colliding with an ETag a client still holds. The ETag is the
+precise validator; Last-Modified has one-second resolution, and clients
+sending both get If-None-Match precedence.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.crypto import md5
+from django.utils.http import http_date
+
+from .access import get_access
+from .models import Child
+
+VERSION_KEY = 'change-version:{}'
+DIRECTORY_SCOPE = 'parents'
+
+
+def parent_scope(parent_id):
+    return f'parent:{parent_id}'
+
+
+def child_scope(child_id):
+    return f'child:{child_id}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def bump(scopes, using=None):
+    """Mark `scopes` as changed once the current transaction commits."""
+    keys = [VERSION_KEY.format(scope) for scope in set(scopes)]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time_ns()), None), using=using)
+
+
+def child_scopes(child_ids):
+    """Scopes a write to `child_ids`' data touches: their own and every parent's family."""
+    child_ids = set(child_ids)
+    if not child_ids:
+        return []
+    parent_ids = set(
+        Child.parents.through.objects.filter(child_id__in=child_ids).values_list('parent_id', flat=True)
+    )
+    return [child_scope(child_id) for child_id in child_ids] + [parent_scope(parent_id) for parent_id in parent_ids]
+
+
+def versions(scopes):
+    """{scope: version}; scopes never bumped (or evicted) start now."""
+    keys = {VERSION_KEY.format(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            # add(): a concurrent bump or first reader wins, then everyone reads its value
+            cache.add(key, now, None)
+        found.update(cache.get_many(missing))
+    return {scope: found.get(key, 0) for key, scope in keys.items()}
+
+
+def request_scopes(access):
+    """The scopes everything `access`' caller can see depends on."""
+    scopes = [user_scope(access.user_id)]
+    if access.child_id is not None:
+        scopes.append(child_scope(access.child_id))
+    if access.is_parent and access.parent_id is not None:
+        scopes.append(parent_scope(access.parent_id))
+    elif access.is_child:
+        # Rewards and sibling leaderboards come from the child's parents' families
+        scopes.extend(parent_scope(parent_id) for parent_id in sorted(access.parent_ids))
+    return scopes
+
+
+class _ConditionalResponse(Exception):
+    """Carries a 304 (or 412) out of initial() past the handler."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified validation for a view's GETs, checked right after
+    authentication and permissions and before the handler runs.
+
+    Override `conditional_scopes()` / `conditional_key()` when a view
+    depends on more than the caller's own scopes.
+    """
+    conditional_changed_at = None  # time_ns() of the newest version, for api/routing.py
+    _validators = None
+
+    def conditional_scopes(self, request):
+        return request_scopes(get_access(request))
+
+    def conditional_key(self, request):
+        """Anything else the response varies on besides the URL."""
+        return ''
+
+    def _is_conditional(self, request):
+        return request.method in ('GET', 'HEAD') and request.user.is_authenticated
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not self._is_conditional(request):
+            return
+        access = get_access(request)
+        current = versions(self.conditional_scopes(request))
+        digest = md5(repr((
+            access.user_id,
+            access.version,
+            request.META.get('HTTP_ACCEPT', ''),
+            self.conditional_key(request),
+            sorted(current.items()),
+        )).encode(), usedforsecurity=False).hexdigest()
+        self.conditional_changed_at = max(current.values(), default=0)
+        self._validators = (f'W/"{digest}"', self.conditional_changed_at // 10 ** 9)
+        etag, last_modified = self._validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            raise _ConditionalResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self._validators is not None and response.status_code in (200, 304):
+            etag, last_modified = self._validators
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Always revalidate; never stored by shared caches
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
@@ -0,0 +1,270 @@
+"""
+Live update events, pushed to dashboards over Server-Sent Events.
+
+Events are published to one channel per child ("child:<id>"); a stream
+subscribes to the channels of the children its user may see, which mirrors
+the visibility rules of the viewsets. Publishing happens on commit, so
+subscribers never see an event for a rolled-back write.
+
+The broker is pluggable via settings.EVENTS_BROKER: RedisBroker fans out
+across processes, InProcessBroker is a single-process stand-in for tests
+and development.
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from .authentication import current_access_version
+
+
+def child_channel(child_id):
+    return f'child:{child_id}'
+
+
+class InProcessBroker:
+    """Fan-out to subscribers living in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def subscribe(self, channels):
+        subscription = InProcessSubscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    async def asubscribe(self, channels):
+        subscription = AsyncInProcessSubscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+class InProcessSubscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = list(channels)
+        self._queue = queue.Queue()
+
+    def put(self, message):
+        self._queue.put(message)
+
+    def get(self, timeout):
+        """Next message, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class AsyncInProcessSubscription:
+    """InProcessSubscription for the event loop; publishers may be on any thread."""
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = list(channels)
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+    def put(self, message):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker._unsubscribe(self)
+
+
+class RedisBroker:
+    """Fan-out through Redis pub/sub, shared by every worker process."""
+
+    def __init__(self):
+        import redis
+
+        self._client = redis.Redis.from_url(settings.EVENTS_REDIS_URL)
+        self._async_client = None
+
+    def publish(self, channel, message):
+        self._client.publish(channel, message)
+
+    def subscribe(self, channels):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*channels)
+        return RedisSubscription(pubsub)
+
+    async def asubscribe(self, channels):
+        if self._async_client is None:
+            import redis.asyncio
+
+            self._async_client = redis.asyncio.Redis.from_url(settings.EVENTS_REDIS_URL)
+        pubsub = self._async_client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(*channels)
+        return AsyncRedisSubscription(pubsub)
+
+
+def _message_data(message):
+    if message is None:
+        return None
+    data = message['data']
+    return data.decode() if isinstance(data, bytes) else data
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    def get(self, timeout):
+        return _message_data(self._pubsub.get_message(timeout=timeout))
+
+    def close(self):
+        self._pubsub.close()
+
+
+class AsyncRedisSubscription:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    async def get(self, timeout):
+        return _message_data(await self._pubsub.get_message(timeout=timeout))
+
+    async def close(self):
+        await self._pubsub.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENTS_BROKER)()
+    return _broker
+
+
+def publish(child_id, event_type, data):
+    """Publish an event about `child_id` once the current transaction commits."""
+    message = json.dumps({'type': event_type, 'child': child_id, 'data': data}, cls=DjangoJSONEncoder)
+    transaction.on_commit(lambda: get_broker().publish(child_channel(child_id), message))
+
+
+def publish_transactions_created(transactions):
+    for txn in transactions:
+        publish(txn.child_id, 'score_transaction.created', {
+            'id': txn.pk,
+            'points': txn.points,
+            'transaction_type': txn.transaction_type,
+            'description': txn.description,
+            'created_at': txn.created_at,
+        })
+
+
+def publish_reward_request(reward_request, event_type):
+    publish(reward_request.child_id, event_type, {
+        'id': reward_request.pk,
+        'reward': reward_request.reward_id,
+        'approved': reward_request.approved,
+        'requested_at': reward_request.requested_at,
+        'approved_at': reward_request.approved_at,
+    })
+
+
+def format_sse(message):
+    """Render a published message as one SSE frame."""
+    event_type = json.loads(message).get('type', 'message')
+    return f'event: {event_type}\ndata: {message}\n\n'
+
+
+def stream(channels, user_id=None, version=None):
+    """
+    SSE frames for `channels` until EVENTS_STREAM_MAX_SECONDS, with heartbeats.
+
+    With `user_id`, the stream also ends once that user's access version no
+    longer matches `version` (their access changed, or they were deactivated):
+    the channels were picked from the old claims, and EventSource reconnects
+    through authentication.
+    """
+    subscription = get_broker().subscribe(channels)
+    heartbeat = settings.EVENTS_HEARTBEAT_SECONDS
+    deadline = time.monotonic() + settings.EVENTS_STREAM_MAX_SECONDS
+    next_check = time.monotonic() + heartbeat
+    try:
+        # Ask EventSource to reconnect shortly after the stream is recycled
+        yield 'retry: 3000\n\n'
+        while time.monotonic() < deadline:
+            message = subscription.get(timeout=heartbeat)
+            if user_id is not None and time.monotonic() >= next_check:
+                if current_access_version(user_id) != version:
+                    return
+                next_check = time.monotonic() + heartbeat
+            yield format_sse(message) if message is not None else ': keepalive\n\n'
+    finally:
+        subscription.close()
+
+
+def _access_unchanged(user_id, version):
+    # Runs on an executor thread outside any request, so nothing else recycles its connection
+    close_old_connections()
+    try:
+        return current_access_version(user_id) == version
+    finally:
+        close_old_connections()
+
+
+async def astream(channels, user_id=None, version=None):
+    """
+    stream() for ASGI servers. Waiting on the broker happens on the event
+    loop, so an open stream holds a socket but no thread.
+    """
+    from asgiref.sync import sync_to_async
+
+    access_unchanged = sync_to_async(_access_unchanged, thread_sensitive=False)
+    subscription = await get_broker().asubscribe(channels)
+    heartbeat = settings.EVENTS_HEARTBEAT_SECONDS
+    deadline = time.monotonic() + settings.EVENTS_STREAM_MAX_SECONDS
+    next_check = time.monotonic() + heartbeat
+    try:
+        yield 'retry: 3000\n\n'
+        while time.monotonic() < deadline:
+            message = await subscription.get(timeout=heartbeat)
+            if user_id is not None and time.monotonic() >= next_check:
+                if not await access_unchanged(user_id, version):
+                    return
+                next_check = time.monotonic() + heartbeat
+            yield format_sse(message) if message is not None else ': keepalive\n\n'
+    finally:
+        await subscription.close()
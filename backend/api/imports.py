@@ -0,0 +1,286 @@
+"""
+Bulk import of users, rewards and historical transactions.
+
+An ImportJob reads its CSV or JSON file in batches. Each batch is validated
+with a handful of set-based queries, written with bulk inserts and committed
+together with the job's progress and row errors, so a crashed job resumes at
+the first uncommitted batch without duplicating rows.
+
+Row formats (CSV headers or JSON object keys):
+  users:        username, password, role, email, parents (';'-separated parent usernames)
+  rewards:      parent, name, cost, description
+  transactions: child, points, transaction_type, description, created_at, parent
+"""
+import csv
+import itertools
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache, conditional
+from .models import Child, ImportJob, ImportRowError, Parent, Reward, ScoreTransaction, User
+
+TRANSACTION_TYPES = {value for value, _ in ScoreTransaction.TRANSACTION_TYPE_CHOICES}
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path):
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as source:
+            rows = json.load(source)
+        if not isinstance(rows, list):
+            raise ValueError('A JSON import file must contain a list of objects.')
+        yield from rows
+    else:
+        with open(path, newline='', encoding='utf-8') as source:
+            yield from csv.DictReader(source)
+
+
+def _text(row, key, required=True):
+    value = row.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'"{key}" is required.')
+    return value
+
+
+def _integer(row, key):
+    try:
+        return int(_text(row, key))
+    except ValueError:
+        raise RowError(f'"{key}" must be an integer.')
+
+
+def _password_executor():
+    # Celery's prefork pool children are daemonic and can't start processes;
+    # PBKDF2 releases the GIL, so threads still hash in parallel there.
+    workers = settings.IMPORT_HASH_WORKERS
+    if multiprocessing.current_process().daemon:
+        return ThreadPoolExecutor(max_workers=workers)
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def import_users(rows, executor):
+    """Returns (created count, [(index, message)]) for the batch."""
+    errors, valid = [], []
+    for index, row in enumerate(rows):
+        try:
+            role = _text(row, 'role')
+            if role not in ('parent', 'child'):
+                raise RowError('"role" must be "parent" or "child".')
+            # Only children link to parents; the column is ignored on parent rows
+            parents = _text(row, 'parents', required=False) if role == 'child' else ''
+            valid.append((index, {
+                'username': _text(row, 'username'),
+                'password': _text(row, 'password'),
+                'role': role,
+                'email': _text(row, 'email', required=False),
+                'parents': [name.strip() for name in parents.split(';') if name.strip()],
+            }))
+        except RowError as exc:
+            errors.append((index, str(exc)))
+
+    usernames = [item['username'] for _, item in valid]
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    unique, seen = [], set()
+    for index, item in valid:
+        if item['username'] in taken or item['username'] in seen:
+            errors.append((index, f'User "{item["username"]}" already exists.'))
+            continue
+        seen.add(item['username'])
+        unique.append((index, item))
+
+    # Parent rows are final now (they have no parents to miss); any other name must already exist
+    batch_parents = {item['username'] for _, item in unique if item['role'] == 'parent'}
+    wanted_parents = {name for _, item in unique for name in item['parents']}
+    parent_ids = dict(
+        Parent.objects.filter(user__username__in=wanted_parents - batch_parents)
+        .values_list('user__username', 'pk')
+    )
+
+    accepted = []
+    for index, item in unique:
+        missing = [name for name in item['parents'] if name not in parent_ids and name not in batch_parents]
+        if missing:
+            errors.append((index, f'Unknown parent(s): {", ".join(missing)}.'))
+            continue
+        accepted.append(item)
+
+    hashed = list(executor.map(make_password, [item['password'] for item in accepted], chunksize=16))
+    users = User.objects.bulk_create([
+        User(username=item['username'], email=item['email'], role=item['role'], password=password)
+        for item, password in zip(accepted, hashed)
+    ])
+
+    parents = Parent.objects.bulk_create([
+        Parent(user=user) for user in users if user.role == 'parent'
+    ])
+    parent_ids.update({parent.user.username: parent.pk for parent in parents})
+    children = Child.objects.bulk_create([
+        Child(user=user) for user in users if user.role == 'child'
+    ])
+    if parents:
+        conditional.bump([conditional.DIRECTORY_SCOPE])
+
+    links_by_child = {}
+    for item, user in zip(accepted, users):
+        if user.role == 'child' and item['parents']:
+            links_by_child[user.username] = {parent_ids[name] for name in item['parents']}
+    Through = Child.parents.through
+    Through.objects.bulk_create([
+        Through(child_id=child.pk, parent_id=parent_id)
+        for child in children
+        for parent_id in links_by_child.get(child.user.username, ())
+    ])
+    for child in children:
+        if child.user.username in links_by_child:
+            # bulk_create skips m2m_changed; keep its receivers (caches etc.) informed
+            m2m_changed.send(
+                sender=Through, instance=child, action='post_add', reverse=False,
+                model=Parent, pk_set=links_by_child[child.user.username], using=child._state.db,
+            )
+    return len(users), errors
+
+
+def import_rewards(rows, executor=None):
+    errors, valid = [], []
+    for index, row in enumerate(rows):
+        try:
+            cost = _integer(row, 'cost')
+            if cost < 0:
+                raise RowError('"cost" must not be negative.')
+            valid.append((index, {
+                'parent': _text(row, 'parent'),
+                'name': _text(row, 'name'),
+                'cost': cost,
+                'description': _text(row, 'description', required=False),
+            }))
+        except RowError as exc:
+            errors.append((index, str(exc)))
+
+    parent_ids = dict(
+        Parent.objects.filter(user__username__in={item['parent'] for _, item in valid})
+        .values_list('user__username', 'pk')
+    )
+    rewards = []
+    for index, item in valid:
+        if item['parent'] not in parent_ids:
+            errors.append((index, f'Unknown parent "{item["parent"]}".'))
+            continue
+        rewards.append(Reward(
+            parent_id=parent_ids[item['parent']], name=item['name'],
+            cost=item['cost'], description=item['description'],
+        ))
+    Reward.objects.bulk_create(rewards)
+    # bulk_create skips post_save, which normally drops the cached catalogs
+    # and bumps the families' change versions
+    parent_ids = {reward.parent_id for reward in rewards}
+    cache.invalidate_parent_catalogs(parent_ids)
+    conditional.bump(conditional.parent_scope(parent_id) for parent_id in parent_ids)
+    return len(rewards), errors
+
+
+def import_transactions(rows, executor=None):
+    errors, valid = [], []
+    for index, row in enumerate(rows):
+        try:
+            transaction_type = _text(row, 'transaction_type')
+            if transaction_type not in TRANSACTION_TYPES:
+                raise RowError(f'"transaction_type" must be one of: {", ".join(sorted(TRANSACTION_TYPES))}.')
+            created_at = None
+            if _text(row, 'created_at', required=False):
+                created_at = parse_datetime(_text(row, 'created_at'))
+                if created_at is None:
+                    raise RowError('"created_at" must be an ISO 8601 datetime.')
+                if settings.USE_TZ and timezone.is_naive(created_at):
+                    created_at = timezone.make_aware(created_at)
+            valid.append((index, {
+                'child': _text(row, 'child'),
+                'parent': _text(row, 'parent', required=False),
+                'points': _integer(row, 'points'),
+                'transaction_type': transaction_type,
+                'description': _text(row, 'description', required=False)[:255],
+                'created_at': created_at,
+            }))
+        except RowError as exc:
+            errors.append((index, str(exc)))
+
+    child_ids = dict(
+        Child.objects.filter(user__username__in={item['child'] for _, item in valid})
+        .values_list('user__username', 'pk')
+    )
+    parent_ids = dict(
+        Parent.objects.filter(user__username__in={item['parent'] for _, item in valid if item['parent']})
+        .values_list('user__username', 'pk')
+    )
+    transactions = []
+    for index, item in valid:
+        if item['child'] not in child_ids:
+            errors.append((index, f'Unknown child "{item["child"]}".'))
+            continue
+        if item['parent'] and item['parent'] not in parent_ids:
+            errors.append((index, f'Unknown parent "{item["parent"]}".'))
+            continue
+        transactions.append(ScoreTransaction(
+            child_id=child_ids[item['child']],
+            parent_id=parent_ids.get(item['parent']),
+            points=item['points'],
+            transaction_type=item['transaction_type'],
+            description=item['description'],
+            created_at=item['created_at'],
+        ))
+    # Normalizes signs, keeps created_at, updates balances and rollups
+    ScoreTransaction.objects.bulk_create(transactions)
+    return len(transactions), errors
+
+
+IMPORTERS = {
+    'users': import_users,
+    'rewards': import_rewards,
+    'transactions': import_transactions,
+}
+
+
+def run_import(job):
+    """Process `job` from its committed progress to the end of its file."""
+    importer = IMPORTERS[job.kind]
+    batch_size = settings.IMPORT_BATCH_SIZE
+    position = job.processed_rows
+    rows = itertools.islice(read_rows(job.source_path), position, None)
+
+    executor = _password_executor() if job.kind == 'users' else None
+    try:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                return
+            with transaction.atomic():
+                committed = ImportJob.objects.select_for_update().values_list('processed_rows', flat=True).get(pk=job.pk)
+                if committed != position:
+                    raise RuntimeError(f'Import job {job.pk} was advanced by another worker.')
+                created, errors = importer(batch, executor)
+                ImportRowError.objects.bulk_create([
+                    ImportRowError(job_id=job.pk, row_number=position + index + 1, data=batch[index], message=message)
+                    for index, message in errors
+                ])
+                ImportJob.objects.filter(pk=job.pk).update(
+                    processed_rows=F('processed_rows') + len(batch),
+                    created_rows=F('created_rows') + created,
+                    error_rows=F('error_rows') + len(errors),
+                    updated_at=timezone.now(),
+                )
+            position += len(batch)
+    finally:
+        if executor is not None:
+            executor.shutdown()
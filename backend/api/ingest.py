@@ -0,0 +1,224 @@
+"""
+Write-behind ingestion of high-frequency point awards.
+
+Integrations that post many small awards per minute send them to
+POST score-transactions/ingest/, which validates them, pushes them onto a
+durable buffer and answers 202 right away. The flush_score_ingest task
+drains the buffer in batches, coalesced per child: one bulk INSERT, one
+balance UPDATE and one rollup pass per batch instead of a commit per award.
+
+Every award carries an idempotency key (the client's, or one assigned on
+receipt), unique per child in the ledger. Client retries and redelivered
+buffer items therefore never count twice. Items are claimed into a
+processing list and only removed once their batch has committed; a flusher
+that dies mid-batch leaves them there for the next one to redo.
+
+The buffer is pluggable via settings.INGEST_BUFFER: RedisIngestBuffer is
+shared by web and worker processes; InProcessIngestBuffer is a
+single-process stand-in for tests and development.
+"""
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .models import Child, ScoreTransaction
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'score-ingest:pending'
+PROCESSING_KEY = 'score-ingest:processing'
+LOCK_KEY = 'score-ingest:lock'
+
+
+class InProcessIngestBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = deque()
+        self._processing = []
+
+    def push(self, messages):
+        with self._lock:
+            self._pending.extend(messages)
+
+    def claim(self, limit):
+        """Messages left by a failed flush first, then up to `limit` new ones."""
+        with self._lock:
+            while self._pending and len(self._processing) < limit:
+                self._processing.append(self._pending.popleft())
+            return list(self._processing)
+
+    def ack(self, messages):
+        with self._lock:
+            for message in messages:
+                self._processing.remove(message)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending) + len(self._processing)
+
+    @contextmanager
+    def flush_lock(self):
+        acquired = self._flush_lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._flush_lock.release()
+
+
+class RedisIngestBuffer:
+    """A Redis list plus a processing list (the reliable-queue pattern)."""
+
+    def __init__(self):
+        import redis
+
+        self._client = redis.Redis.from_url(settings.INGEST_REDIS_URL)
+
+    def push(self, messages):
+        if messages:
+            self._client.lpush(PENDING_KEY, *messages)
+
+    def claim(self, limit):
+        processing = self._client.lrange(PROCESSING_KEY, 0, -1)
+        wanted = max(limit - len(processing), 0)
+        if wanted:
+            pipe = self._client.pipeline()
+            for _ in range(wanted):
+                pipe.rpoplpush(PENDING_KEY, PROCESSING_KEY)
+            processing += [message for message in pipe.execute() if message is not None]
+        return [message.decode() for message in processing]
+
+    def ack(self, messages):
+        pipe = self._client.pipeline()
+        for message in messages:
+            pipe.lrem(PROCESSING_KEY, 1, message)
+        pipe.execute()
+
+    def __len__(self):
+        return self._client.llen(PENDING_KEY) + self._client.llen(PROCESSING_KEY)
+
+    @contextmanager
+    def flush_lock(self):
+        # One flusher at a time: processing-list leftovers then always belong to a dead one
+        lock = self._client.lock(LOCK_KEY, timeout=settings.INGEST_LOCK_SECONDS, blocking=False)
+        acquired = lock.acquire()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except Exception:  # expired meanwhile; nothing to release
+                    pass
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = import_string(settings.INGEST_BUFFER)()
+    return _buffer
+
+
+def enqueue(awards, parent_id=None):
+    """
+    Buffer validated awards ({child, points, transaction_type, description,
+    idempotency_key}) on behalf of `parent_id`. Returns their keys.
+    """
+    received_at = timezone.now().isoformat()
+    messages, keys = [], []
+    for award in awards:
+        key = award.get('idempotency_key') or uuid.uuid4().hex
+        keys.append(key)
+        messages.append(json.dumps({
+            'key': key,
+            'child': award['child'],
+            'parent': parent_id,
+            'points': award['points'],
+            'transaction_type': award['transaction_type'],
+            'description': award.get('description', ''),
+            'received_at': received_at,
+        }))
+    get_buffer().push(messages)
+    return keys
+
+
+def _insert_new(items):
+    """Insert the items whose (child, key) isn't in the ledger yet; returns how many."""
+    existing = set(
+        ScoreTransaction.objects.filter(
+            child_id__in={item['child'] for item in items},
+            idempotency_key__in={item['key'] for item in items},
+        ).values_list('child_id', 'idempotency_key')
+    )
+    live_children = set(Child.objects.filter(pk__in={item['child'] for item in items}).values_list('pk', flat=True))
+    rows, seen = [], set(existing)
+    for item in items:
+        identity = (item['child'], item['key'])
+        if identity in seen:
+            continue
+        seen.add(identity)
+        if item['child'] not in live_children:
+            logger.warning('Dropping buffered award %s for missing child %s', item['key'], item['child'])
+            continue
+        rows.append(ScoreTransaction(
+            child_id=item['child'],
+            parent_id=item['parent'],
+            points=item['points'],
+            transaction_type=item['transaction_type'],
+            description=item['description'],
+            created_at=parse_datetime(item['received_at']),
+            idempotency_key=item['key'],
+        ))
+    # Grouped per child, so each child's rows land together and lock its balance once
+    rows.sort(key=lambda row: (row.child_id, row.created_at))
+    # One INSERT, one balance UPDATE and one rollup pass (ScoreTransactionQuerySet.bulk_create)
+    ScoreTransaction.objects.bulk_create(rows)
+    return len(rows)
+
+
+def flush(batch_size=None):
+    """
+    Move one batch from the buffer into the ledger. Returns the number of
+    awards inserted, or None if another flusher holds the lock.
+    """
+    buffer = get_buffer()
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    with buffer.flush_lock() as acquired:
+        if not acquired:
+            return None
+        messages = buffer.claim(batch_size)
+        if not messages:
+            return 0
+        items = [json.loads(message) for message in messages]
+        try:
+            with transaction.atomic():
+                inserted = _insert_new(items)
+        except IntegrityError:
+            # A key landed concurrently (e.g. a flusher whose lock expired), or an
+            # award can't be stored at all. Redo the batch award by award, dropping
+            # the ones that still fail rather than redelivering them forever.
+            inserted = 0
+            for item in items:
+                try:
+                    with transaction.atomic():
+                        inserted += _insert_new([item])
+                except IntegrityError:
+                    logger.exception('Dropping buffered award %s for child %s', item['key'], item['child'])
+        buffer.ack(messages)
+        return inserted
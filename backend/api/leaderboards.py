@@ -0,0 +1,227 @@
+"""
+Sibling leaderboards: children ranked by balance within each parent's group.
+
+Every parent has a board holding their children scored by balance. It is
+kept current incrementally: ledger writes add their per-child point deltas
+to the boards of the child's parents, and Child.parents changes add or
+remove members. All of this runs after commit (see api/signals.py), so
+reading the top N or a child's rank +/- k never touches the ledger.
+
+A board is built from the stored balances the first time it is read and is
+only updated incrementally from then on. `manage.py rebuild_leaderboards`
+rebuilds boards from scratch, e.g. after restoring Redis or repairing
+balances with recompute_balances.
+
+The backend is pluggable via settings.LEADERBOARD_BACKEND:
+RedisLeaderboards keeps one sorted set per board and is shared by all
+processes. InProcessLeaderboards is a per-process stand-in for tests and
+development: a bisect-sorted list per board, with O(log n) lookups and
+O(n) inserts.
+"""
+import bisect
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import Child
+
+BOARD_KEY = 'leaderboard:parent:{}'
+BUILT_KEY = 'leaderboard:parent:{}:built'
+
+# Only touch boards that have been built, so an increment never creates a partial one
+_INCREMENT_IF_BUILT = """
+if redis.call('exists', KEYS[2]) == 1 then
+    redis.call('zincrby', KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+_ADD_IF_BUILT = """
+if redis.call('exists', KEYS[2]) == 1 then
+    redis.call('zadd', KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+
+class RedisLeaderboards:
+    def __init__(self):
+        import redis
+
+        self._client = redis.Redis.from_url(settings.LEADERBOARD_REDIS_URL)
+        self._increment = self._client.register_script(_INCREMENT_IF_BUILT)
+        self._add = self._client.register_script(_ADD_IF_BUILT)
+
+    def is_built(self, parent_id):
+        return bool(self._client.exists(BUILT_KEY.format(parent_id)))
+
+    def replace(self, parent_id, scores):
+        pipe = self._client.pipeline(transaction=True)
+        pipe.delete(BOARD_KEY.format(parent_id))
+        if scores:
+            pipe.zadd(BOARD_KEY.format(parent_id), {str(child_id): score for child_id, score in scores.items()})
+        pipe.set(BUILT_KEY.format(parent_id), 1)
+        pipe.execute()
+
+    def increment(self, parent_id, child_id, delta):
+        self._increment(keys=[BOARD_KEY.format(parent_id), BUILT_KEY.format(parent_id)], args=[delta, child_id])
+
+    def add(self, parent_id, child_id, score):
+        self._add(keys=[BOARD_KEY.format(parent_id), BUILT_KEY.format(parent_id)], args=[score, child_id])
+
+    def remove(self, parent_id, child_id):
+        self._client.zrem(BOARD_KEY.format(parent_id), child_id)
+
+    def size(self, parent_id):
+        return self._client.zcard(BOARD_KEY.format(parent_id))
+
+    def rank(self, parent_id, child_id):
+        """0-based rank, highest score first, or None if not on the board."""
+        return self._client.zrevrank(BOARD_KEY.format(parent_id), child_id)
+
+    def page(self, parent_id, start, stop):
+        """[(child_id, score)] for ranks start..stop inclusive."""
+        entries = self._client.zrevrange(BOARD_KEY.format(parent_id), start, stop, withscores=True)
+        return [(int(member), int(score)) for member, score in entries]
+
+
+class InProcessLeaderboards:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boards = {}  # parent_id -> (sorted [(-score, child_id)], {child_id: score})
+
+    def is_built(self, parent_id):
+        return parent_id in self._boards
+
+    def replace(self, parent_id, scores):
+        with self._lock:
+            self._boards[parent_id] = (
+                sorted((-score, child_id) for child_id, score in scores.items()),
+                dict(scores),
+            )
+
+    def _set(self, parent_id, child_id, score):
+        entries, scores = self._boards[parent_id]
+        if child_id in scores:
+            del entries[bisect.bisect_left(entries, (-scores[child_id], child_id))]
+        scores[child_id] = score
+        bisect.insort(entries, (-score, child_id))
+
+    def increment(self, parent_id, child_id, delta):
+        with self._lock:
+            if parent_id in self._boards:
+                self._set(parent_id, child_id, self._boards[parent_id][1].get(child_id, 0) + delta)
+
+    def add(self, parent_id, child_id, score):
+        with self._lock:
+            if parent_id in self._boards:
+                self._set(parent_id, child_id, score)
+
+    def remove(self, parent_id, child_id):
+        with self._lock:
+            board = self._boards.get(parent_id)
+            if board is not None and child_id in board[1]:
+                entries, scores = board
+                del entries[bisect.bisect_left(entries, (-scores.pop(child_id), child_id))]
+
+    def size(self, parent_id):
+        return len(self._boards.get(parent_id, ((), {}))[1])
+
+    def rank(self, parent_id, child_id):
+        with self._lock:
+            board = self._boards.get(parent_id)
+            if board is None or child_id not in board[1]:
+                return None
+            entries, scores = board
+            return bisect.bisect_left(entries, (-scores[child_id], child_id))
+
+    def page(self, parent_id, start, stop):
+        with self._lock:
+            entries = self._boards.get(parent_id, ([], {}))[0]
+            return [(child_id, -score) for score, child_id in entries[start:stop + 1]]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = import_string(settings.LEADERBOARD_BACKEND)()
+    return _backend
+
+
+def rebuild(parent_ids):
+    """Rebuild the boards of `parent_ids` from the stored balances."""
+    parent_ids = list(parent_ids)
+    scores = {parent_id: {} for parent_id in parent_ids}
+    links = Child.parents.through.objects.filter(parent_id__in=parent_ids).values_list(
+        'parent_id', 'child_id', 'child__balance'
+    )
+    for parent_id, child_id, balance in links:
+        scores[parent_id][child_id] = balance
+    backend = get_backend()
+    for parent_id, board in scores.items():
+        backend.replace(parent_id, board)
+    return len(parent_ids)
+
+
+def ensure_built(parent_ids):
+    """Build whichever boards of `parent_ids` haven't been yet, in one query."""
+    backend = get_backend()
+    missing = [parent_id for parent_id in parent_ids if not backend.is_built(parent_id)]
+    if missing:
+        rebuild(missing)
+
+
+def apply_deltas(deltas):
+    """Add {child_id: points} to the boards of those children's parents."""
+    if not deltas:
+        return
+    backend = get_backend()
+    links = Child.parents.through.objects.filter(child_id__in=list(deltas)).values_list('parent_id', 'child_id')
+    for parent_id, child_id in links:
+        backend.increment(parent_id, child_id, deltas[child_id])
+
+
+def add_members(links):
+    """Put children on their new parents' boards; `links` is [(parent_id, child_id)]."""
+    if not links:
+        return
+    backend = get_backend()
+    balances = dict(Child.objects.filter(pk__in={child_id for _, child_id in links}).values_list('pk', 'balance'))
+    for parent_id, child_id in links:
+        if child_id in balances:
+            backend.add(parent_id, child_id, balances[child_id])
+
+
+def remove_members(links):
+    backend = get_backend()
+    for parent_id, child_id in links:
+        backend.remove(parent_id, child_id)
+
+
+def board(parent_id, top=10, child_id=None, around=2):
+    """
+    Top `top` of a parent's board and, with `child_id`, that child's rank
+    with `around` neighbours either side. Entries are (rank, child_id,
+    balance) with 1-based ranks.
+    """
+    backend = get_backend()
+    ensure_built([parent_id])
+    result = {
+        'size': backend.size(parent_id),
+        'top': [(rank + 1, member, score) for rank, (member, score) in enumerate(backend.page(parent_id, 0, top - 1))],
+        'me': None,
+    }
+    if child_id is not None:
+        rank = backend.rank(parent_id, child_id)
+        if rank is not None:
+            start = max(rank - around, 0)
+            entries = backend.page(parent_id, start, rank + around)
+            result['me'] = {
+                'rank': rank + 1,
+                'around': [(start + offset + 1, member, score) for offset, (member, score) in enumerate(entries)],
+            }
+    return result
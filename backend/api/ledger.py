@@ -0,0 +1,254 @@
+"""
+Bookkeeping for the score ledger.
+
+Every write to ScoreTransaction must keep Child.balance in step with it, in
+the same database transaction. The model save()/delete() and the
+ScoreTransaction queryset route through the helpers here; code that writes
+ledger rows any other way has to call apply_balance_deltas() itself.
+"""
+import random
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from . import events
+from .models import ArchivedScoreTransaction, Child, LedgerCheckpoint, RewardRequest, ScoreTransaction
+
+
+class InsufficientPoints(ValueError):
+    pass
+
+
+class AlreadyApproved(ValueError):
+    pass
+
+
+def ledger_deltas(added=(), removed=()):
+    """Net {child_id: points} of ledger rows added and removed."""
+    deltas = defaultdict(int)
+    for txn in added:
+        deltas[txn.child_id] += txn.points
+    for txn in removed:
+        deltas[txn.child_id] -= txn.points
+    return {child_id: delta for child_id, delta in deltas.items() if delta}
+
+
+def apply_balance_deltas(deltas, using=None):
+    """
+    Add {child_id: delta} to the stored balances with a single UPDATE.
+
+    The increment is done in SQL (balance = balance + delta) so concurrent
+    writers never lose each other's updates.
+    """
+    if not deltas:
+        return 0
+    queryset = Child.objects.using(using) if using else Child.objects
+    if len(deltas) == 1:
+        (child_id, delta), = deltas.items()
+        return queryset.filter(pk=child_id).update(balance=F('balance') + delta)
+    increment = Case(
+        *[When(pk=child_id, then=Value(delta)) for child_id, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=list(deltas)).update(balance=F('balance') + increment)
+
+
+def _with_retries(operation):
+    """
+    Run `operation` in its own transaction, retrying on lock timeouts,
+    deadlocks and serialization failures. Inside an outer atomic block a
+    failed statement poisons the whole transaction, so no retry is attempted.
+    """
+    attempts = getattr(settings, 'REDEMPTION_MAX_RETRIES', 3)
+    if transaction.get_connection().in_atomic_block:
+        attempts = 1
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                return operation()
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def _debit(child_id, cost, parent_id, description):
+    # Check and debit in one conditional UPDATE: the row lock it takes is the
+    # only serialization point, and only for this child.
+    debited = Child.objects.filter(pk=child_id, balance__gte=cost).update(balance=F('balance') - cost)
+    if not debited:
+        raise InsufficientPoints("Insufficient score")
+    txn = ScoreTransaction(
+        child_id=child_id,
+        parent_id=parent_id,
+        points=-cost,
+        transaction_type='redeem',
+        description=description,
+    )
+    # The balance was already moved by the UPDATE above
+    ScoreTransaction.objects.bulk_create([txn], update_balances=False)
+    return txn
+
+
+def redeem(child_id, cost, *, parent_id=None, description=''):
+    """
+    Debit `cost` points from a child and record the 'redeem' transaction.
+    Raises InsufficientPoints if the balance can't cover it.
+    """
+    return _with_retries(lambda: _debit(child_id, cost, parent_id, description))
+
+
+def approve_reward_request(reward_request, approver_id, *, parent_id=None, description=None):
+    """
+    Approve a RewardRequest on behalf of user `approver_id` and debit its
+    reward's cost, atomically.
+
+    The request is flipped with a conditional UPDATE, so two concurrent
+    approvals can't both debit. Raises AlreadyApproved or InsufficientPoints;
+    on either, nothing is written.
+    """
+    reward = reward_request.reward
+    if description is None:
+        description = f"Approved reward: {reward.name}"
+
+    def operation():
+        now = timezone.now()
+        claimed = RewardRequest.objects.filter(pk=reward_request.pk, approved=False).update(
+            approved=True, approved_at=now, approved_by_id=approver_id,
+        )
+        if not claimed:
+            raise AlreadyApproved("This request has already been approved.")
+        txn = _debit(reward_request.child_id, reward.cost, parent_id, description)
+        return txn, now
+
+    txn, approved_at = _with_retries(operation)
+    reward_request.approved = True
+    reward_request.approved_at = approved_at
+    reward_request.approved_by_id = approver_id
+    events.publish_reward_request(reward_request, 'reward_request.approved')
+    return txn
+
+
+def approve_reward_requests(parent_id, approver_id, request_ids):
+    """
+    Approve many of parent `parent_id`'s pending RewardRequests in one
+    transaction, on behalf of user `approver_id`.
+
+    Requests are applied in the order given, against one running balance per
+    child, so an earlier request can use up points a later one needed. Returns
+    {request_id: outcome}, outcome being 'approved', 'not_found',
+    'already_approved' or 'insufficient_points'.
+    """
+    request_ids = list(dict.fromkeys(request_ids))
+
+    def operation():
+        # Ownership, state and costs for the whole batch in one query
+        requests = {
+            req.pk: req
+            for req in RewardRequest.objects.select_for_update(of=('self',))
+            .filter(pk__in=request_ids, child__parents=parent_id)
+            .select_related('reward')
+        }
+        balances = dict(
+            Child.objects.select_for_update()
+            .filter(pk__in={req.child_id for req in requests.values()})
+            .values_list('pk', 'balance')
+        )
+
+        outcomes = {}
+        transactions = []
+        for request_id in request_ids:
+            req = requests.get(request_id)
+            if req is None:
+                outcomes[request_id] = 'not_found'
+            elif req.approved:
+                outcomes[request_id] = 'already_approved'
+            elif balances[req.child_id] < req.reward.cost:
+                outcomes[request_id] = 'insufficient_points'
+            else:
+                balances[req.child_id] -= req.reward.cost
+                outcomes[request_id] = 'approved'
+                transactions.append(ScoreTransaction(
+                    child_id=req.child_id,
+                    parent_id=parent_id,
+                    points=-req.reward.cost,
+                    transaction_type='redeem',
+                    description=f"Approved reward: {req.reward.name}",
+                ))
+
+        approved_ids = [request_id for request_id, outcome in outcomes.items() if outcome == 'approved']
+        if approved_ids:
+            # The children are locked above, so the balance updates done by
+            # bulk_create match the running balances computed here.
+            ScoreTransaction.objects.bulk_create(transactions)
+            approved_at = timezone.now()
+            RewardRequest.objects.filter(pk__in=approved_ids).update(
+                approved=True, approved_at=approved_at, approved_by_id=approver_id,
+            )
+            for request_id in approved_ids:
+                req = requests[request_id]
+                req.approved, req.approved_at, req.approved_by_id = True, approved_at, approver_id
+                events.publish_reward_request(req, 'reward_request.approved')
+        return outcomes
+
+    return _with_retries(operation)
+
+
+def compact_child_ledger(child_id, cutoff, batch_size=1000):
+    """
+    Move a child's transactions older than `cutoff` into the archive table and
+    fold them into the child's LedgerCheckpoint. Balances are unaffected.
+
+    Each batch commits on its own, so an interrupted run leaves a consistent
+    checkpoint and simply resumes where it stopped. Returns rows archived.
+    """
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                ScoreTransaction.objects.select_for_update()
+                .filter(child_id=child_id, created_at__lt=cutoff)
+                .order_by('created_at', 'id')[:batch_size]
+            )
+            if not rows:
+                return archived
+            ArchivedScoreTransaction.objects.bulk_create([
+                ArchivedScoreTransaction(
+                    id=row.pk,
+                    child_id=row.child_id,
+                    parent_id=row.parent_id,
+                    points=row.points,
+                    transaction_type=row.transaction_type,
+                    description=row.description,
+                    created_at=row.created_at,
+                )
+                for row in rows
+            ])
+            ScoreTransaction.objects.filter(pk__in=[row.pk for row in rows]).delete(update_balances=False)
+
+            checkpoint, _ = LedgerCheckpoint.objects.select_for_update().get_or_create(
+                child_id=child_id, defaults={'cutoff': cutoff}
+            )
+            checkpoint.balance += sum(row.points for row in rows)
+            checkpoint.archived_count += len(rows)
+            checkpoint.cutoff = max(checkpoint.cutoff, cutoff)
+            checkpoint.save(update_fields=['balance', 'archived_count', 'cutoff', 'updated_at'])
+        archived += len(rows)
+
+
+def ledger_totals(child_ids):
+    """{child_id: checkpoint balance + live tail} computed from the ledger itself."""
+    totals = dict(
+        ScoreTransaction.objects.filter(child_id__in=child_ids)
+        .values_list('child_id')
+        .annotate(total=Sum('points'))
+        .values_list('child_id', 'total')
+    )
+    for child_id, balance in LedgerCheckpoint.objects.filter(child_id__in=child_ids).values_list('child_id', 'balance'):
+        totals[child_id] = (totals.get(child_id) or 0) + balance
+    return totals
@@ -0,0 +1,316 @@
+import json
+import queue
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from api.models import Child, Parent, Reward, RewardRequest
+
+SCENARIOS = ('token', 'register', 'children', 'transactions', 'redeem', 'approve')
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+class InProcessClient:
+    """Drives the URLconf through django.test.Client, one client per thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, data=None, token=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        if method == 'GET':
+            response = client.get(path, **extra)
+        else:
+            response = client.post(path, data=json.dumps(data or {}), content_type='application/json', **extra)
+        return response.status_code, response.get('Server-Timing', ''), response.content
+
+
+class HTTPClient:
+    """Drives a running server at `base_url`."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, data=None, token=None):
+        body = json.dumps(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if token:
+            request.add_header('Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.headers.get('Server-Timing', ''), response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.headers.get('Server-Timing', ''), exc.read()
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API endpoints against data from generate_synthetic_data: "
+        "p50/p95/p99 latency and queries per request for each scenario, at a "
+        "given concurrency. Runs in-process unless --base-url points at a server. "
+        "Save results with --output and compare later runs with --baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f'Comma-separated subset of: {", ".join(SCENARIOS)}.')
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--users', type=int, default=20, help='Distinct parents/children to act as.')
+        parser.add_argument('--prefix', default='bench', help='The generate_synthetic_data --prefix.')
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument('--base-url', help='Benchmark a running server instead of the in-process URLconf.')
+        parser.add_argument('--api-prefix', default='', help='Path the api URLconf is mounted at, e.g. /api.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='Compare against results saved with --output.')
+        parser.add_argument('--tolerance', type=float, default=0.10,
+                            help='Allowed p95 slowdown against the baseline, as a fraction.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(sorted(unknown))}.')
+        self.options = options
+        self.prefix = options['api_prefix'].rstrip('/')
+
+        if options['base_url']:
+            self.client = HTTPClient(options['base_url'])
+            results = self._run(scenarios)
+        else:
+            self.client = InProcessClient()
+            # Every request sampled, so each reports its query count via Server-Timing
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                PROFILING_ENABLED=True,
+                PROFILING_SAMPLE_RATE=1.0,
+            ):
+                results = self._run(scenarios)
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'target': options['base_url'] or 'in-process',
+                'database': connection.vendor,
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+            },
+            'scenarios': results,
+        }
+        self._print(results)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['baseline']:
+            self._compare(results)
+
+    # -- fixtures -----------------------------------------------------------
+
+    def _login(self, username):
+        status, _, content = self.client.request(
+            'POST', f'{self.prefix}/api/token/', {'username': username, 'password': self.options['password']},
+        )
+        if status != 200:
+            raise CommandError(f'Could not log in as {username} ({status}); run generate_synthetic_data first.')
+        return json.loads(content)['access']
+
+    def _parents(self):
+        parents = list(
+            Parent.objects.filter(user__username__regex=rf'^{re.escape(self.options["prefix"])}-p\d+$')
+            .select_related('user').order_by('pk')[:self.options['users']]
+        )
+        if not parents:
+            raise CommandError(f'No "{self.options["prefix"]}-p*" parents; run generate_synthetic_data first.')
+        return parents
+
+    def _build(self, scenario, count):
+        """`count` (method, path, data, token) requests for `scenario`."""
+        prefix = self.prefix
+        parents = self._parents()
+
+        if scenario == 'token':
+            users = [parent.user.username for parent in parents]
+            return [
+                ('POST', f'{prefix}/api/token/', {'username': users[i % len(users)], 'password': self.options['password']}, None)
+                for i in range(count)
+            ]
+        if scenario == 'register':
+            run = uuid.uuid4().hex[:8]
+            return [
+                ('POST', f'{prefix}/api/register/', {
+                    'username': f'{self.options["prefix"]}-reg-{run}-{i}',
+                    'password': self.options['password'],
+                    'role': 'parent' if i % 2 else 'child',
+                }, None)
+                for i in range(count)
+            ]
+        if scenario in ('children', 'transactions'):
+            path = f'{prefix}/children/' if scenario == 'children' else f'{prefix}/score-transactions/'
+            tokens = [self._login(parent.user.username) for parent in parents]
+            return [('GET', path, None, tokens[i % len(tokens)]) for i in range(count)]
+        if scenario == 'redeem':
+            children = list(
+                Child.objects.filter(parents__in=parents).select_related('user').distinct().order_by('pk')
+                [:self.options['users']]
+            )
+            plans = []
+            for child in children:
+                reward = Reward.objects.filter(parent__children=child).order_by('cost').first()
+                if reward is not None:
+                    plans.append((self._login(child.user.username), reward.pk))
+            if not plans:
+                raise CommandError('No child with a reward to redeem.')
+            return [
+                ('POST', f'{prefix}/rewards/{plans[i % len(plans)][1]}/redeem/', None, plans[i % len(plans)][0])
+                for i in range(count)
+            ]
+        if scenario == 'approve':
+            tokens = {parent.pk: self._login(parent.user.username) for parent in parents}
+            pending = list(
+                RewardRequest.objects.filter(approved=False, child__parents__in=parents)
+                .values_list('pk', 'child__parents').order_by('pk')
+            )
+            plans, seen = [], set()
+            for request_id, parent_id in pending:
+                if parent_id in tokens and request_id not in seen:
+                    seen.add(request_id)
+                    plans.append(('POST', f'{prefix}/reward-requests/{request_id}/approve/', None, tokens[parent_id]))
+            if len(plans) < count:
+                self.stderr.write(self.style.WARNING(
+                    f'Only {len(plans)} pending reward requests; approve runs {len(plans)} requests.'
+                ))
+            return plans[:count]
+
+    # -- running ------------------------------------------------------------
+
+    def _run(self, scenarios):
+        results = {}
+        for scenario in scenarios:
+            warmup = self.options['warmup']
+            plans = self._build(scenario, warmup + self.options['requests'])
+            self._execute(plans[:warmup])
+            samples, elapsed = self._execute(plans[warmup:])
+            results[scenario] = self._summarize(samples, elapsed)
+        return results
+
+    def _execute(self, plans):
+        """Run `plans` on --concurrency threads; returns ([(seconds, status, queries)], wall seconds)."""
+        work = queue.Queue()
+        for plan in plans:
+            work.put(plan)
+        samples = []
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        method, path, data, token = work.get_nowait()
+                    except queue.Empty:
+                        return
+                    start = time.perf_counter()
+                    status, server_timing, _ = self.client.request(method, path, data, token)
+                    seconds = time.perf_counter() - start
+                    match = QUERIES_RE.search(server_timing)
+                    with lock:
+                        samples.append((seconds, status, int(match.group(1)) if match else None))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, time.perf_counter() - started
+
+    @staticmethod
+    def _summarize(samples, elapsed):
+        latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+        queries = [count for _, _, count in samples if count is not None]
+        statuses = {}
+        for _, status, _ in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, status, _ in samples if status >= 400),
+            'statuses': statuses,
+            'rps': round(len(samples) / elapsed, 1) if elapsed else None,
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        }
+
+    # -- reporting ----------------------------------------------------------
+
+    def _print(self, results):
+        def ms(value):
+            return f'{value:.1f}' if value is not None else '-'
+
+        self.stdout.write(f"{'scenario':<14}{'reqs':>6}{'errors':>8}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        for scenario, result in results.items():
+            queries = result['queries_per_request']
+            self.stdout.write(
+                f"{scenario:<14}{result['requests']:>6}{result['errors']:>8}{ms(result['rps']):>8}"
+                f"{ms(result['p50_ms']):>9}{ms(result['p95_ms']):>9}{ms(result['p99_ms']):>9}"
+                f"{queries if queries is not None else '-':>9}"
+            )
+
+    def _compare(self, results):
+        try:
+            with open(self.options['baseline']) as source:
+                baseline = json.load(source)['scenarios']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Can't read baseline {self.options['baseline']}: {exc}")
+
+        regressions = []
+        for scenario, result in results.items():
+            before = baseline.get(scenario)
+            if before is None:
+                continue
+            notes = []
+            if before.get('p95_ms') and result['p95_ms'] is not None:
+                change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms']
+                notes.append(f"p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms ({change:+.0%})")
+                if change > self.options['tolerance']:
+                    regressions.append(f'{scenario}: p95 {change:+.0%}')
+            if before.get('queries_per_request') is not None and result['queries_per_request'] is not None:
+                notes.append(f"queries {before['queries_per_request']} -> {result['queries_per_request']}")
+                # Means wobble slightly with cache warmth; a whole extra query is real
+                if result['queries_per_request'] - before['queries_per_request'] >= 0.5:
+                    regressions.append(f"{scenario}: queries {before['queries_per_request']} -> {result['queries_per_request']}")
+            self.stdout.write(f"{scenario}: {', '.join(notes)}")
+
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+            return
+        for regression in regressions:
+            self.stdout.write(self.style.WARNING(f'Regression: {regression}'))
+        if self.options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} regression(s) against the baseline.')
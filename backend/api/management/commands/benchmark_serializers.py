@@ -0,0 +1,92 @@
+import gc
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from api import projections
+from api.access import AccessContext
+from api.models import Parent, Reward
+from api.serializers import (
+    ChildSerializer, RewardRequestSerializer, RewardSerializer, ScoreTransactionSerializer,
+)
+from api.views import visible_children, visible_ledger, visible_reward_requests
+
+LISTS = ('transactions', 'rewards', 'children', 'reward_requests')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the list endpoints' serializers with their values() projections "
+        "(api/projections.py): CPU time, peak memory and queries to build and "
+        "render one response of --rows rows, as seen by --parent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lists', default=','.join(LISTS), help=f'Comma-separated subset of: {", ".join(LISTS)}.')
+        parser.add_argument('--rows', type=int, default=500, help='Rows per response.')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--parent', default='bench-p0', help='Username of the parent to list as.')
+
+    def handle(self, *args, **options):
+        lists = [name.strip() for name in options['lists'].split(',') if name.strip()]
+        unknown = set(lists) - set(LISTS)
+        if unknown:
+            raise CommandError(f'Unknown list(s): {", ".join(sorted(unknown))}.')
+        parent = Parent.objects.filter(user__username=options['parent']).select_related('user').first()
+        if parent is None:
+            raise CommandError(f'No parent "{options["parent"]}"; run generate_synthetic_data first.')
+        access = AccessContext(parent.user)
+        rows = options['rows']
+
+        cases = {
+            'transactions': (visible_ledger(access)[:rows], ScoreTransactionSerializer, projections.SCORE_TRANSACTION),
+            'rewards': (
+                Reward.objects.filter(parent_id__in=access.parent_ids).select_related('parent__user').order_by('pk')[:rows],
+                RewardSerializer, projections.REWARD,
+            ),
+            'children': (visible_children(access)[:rows], ChildSerializer, projections.CHILD),
+            'reward_requests': (visible_reward_requests(access)[:rows], RewardRequestSerializer, projections.REWARD_REQUEST),
+        }
+
+        self.stdout.write(
+            f"{'list':<17}{'path':<12}{'rows':>6}{'cpu ms':>9}{'peak KiB':>10}{'queries':>9}{'bytes':>9}"
+        )
+        for name in lists:
+            queryset, serializer_class, projection = cases[name]
+            fields = list(projection.fields)
+            paths = {
+                'serializer': lambda: serializer_class(queryset.all(), many=True).data,
+                'projection': lambda: projection.list(queryset.all(), fields),
+            }
+            results = {path: self._measure(build, options['iterations']) for path, build in paths.items()}
+            for path, (count, cpu, peak, queries, size) in results.items():
+                self.stdout.write(f"{name:<17}{path:<12}{count:>6}{cpu:>9.2f}{peak / 1024:>10.1f}{queries:>9}{size:>9}")
+            before, after = results['serializer'], results['projection']
+            if after[1] and after[2]:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{name}: {before[1] / after[1]:.1f}x less CPU, {before[2] / after[2]:.1f}x less peak memory"
+                ))
+
+    @staticmethod
+    def _measure(build, iterations):
+        """(rows, mean CPU ms, peak bytes, queries, response bytes) for build() + JSON rendering."""
+        renderer = JSONRenderer()
+        content = renderer.render(build())  # warm up: connection, caches, imports
+        with CaptureQueriesContext(connection) as captured:
+            count = len(build())
+        # Timed without tracemalloc, whose hooks would inflate the CPU figures
+        gc.collect()
+        start = time.process_time()
+        for _ in range(iterations):
+            renderer.render(build())
+        cpu = time.process_time() - start
+        gc.collect()
+        tracemalloc.start()
+        renderer.render(build())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return count, cpu / iterations * 1000, peak, len(captured), len(content)
@@ -0,0 +1,138 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Child, Parent, Reward, RewardRequest, ScoreTransaction, User
+
+REWARD_NAMES = ['Ice cream', 'Movie night', 'Extra screen time', 'Stay up late', 'New book', 'Trip to the park']
+DESCRIPTIONS = ['Homework', 'Tidied room', 'Helped with dinner', 'Walked the dog', 'Forgot chores', 'Reading']
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate reproducible synthetic families for load tests and benchmarks: "
+        "parents with children, shared co-parents, reward catalogs, transaction "
+        "history and pending reward requests. Usernames are <prefix>-p<i>, "
+        "<prefix>-p<i>-c<j> and <prefix>-p<i>-co; every password is --password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parents', type=int, default=100, help='Families (primary parents) to create.')
+        parser.add_argument('--children', type=int, default=3, help='Children per family.')
+        parser.add_argument('--transactions', type=int, default=200, help='Ledger rows per child.')
+        parser.add_argument('--rewards', type=int, default=5, help='Rewards in each parent\'s catalog.')
+        parser.add_argument('--requests', type=int, default=2, help='Pending reward requests per child.')
+        parser.add_argument('--co-parent-ratio', type=float, default=0.5,
+                            help='Share of families with a second parent linked to every child.')
+        parser.add_argument('--days', type=int, default=180, help='Spread the history over this many days.')
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Ledger rows per bulk insert.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Users named "{prefix}-*" already exist; pick another --prefix.')
+        rng = random.Random(options['seed'])
+        # One hash for everyone: hashing per user would dominate the run
+        password = make_password(options['password'])
+
+        with transaction.atomic():
+            families = self._create_families(rng, options, password)
+        self.stdout.write(f"{len(families)} families, {sum(len(kids) for _, _, kids in families)} children")
+
+        now = timezone.now()
+        span = timedelta(days=options['days']).total_seconds()
+        batch = []
+        inserted = 0
+        for parent, co_parent, children in families:
+            for child in children:
+                for _ in range(options['transactions']):
+                    transaction_type = rng.choices(['add', 'subtract', 'redeem'], weights=[8, 1, 1])[0]
+                    batch.append(ScoreTransaction(
+                        child_id=child.pk,
+                        parent_id=co_parent.pk if co_parent and rng.random() < 0.3 else parent.pk,
+                        points=rng.randint(1, 20) if transaction_type == 'add' else rng.randint(1, 5),
+                        transaction_type=transaction_type,
+                        description=rng.choice(DESCRIPTIONS),
+                        created_at=now - timedelta(seconds=rng.uniform(0, span)),
+                    ))
+                    if len(batch) >= options['batch_size']:
+                        inserted += self._insert(batch)
+                        batch = []
+        inserted += self._insert(batch)
+        self.stdout.write(f"{inserted} transactions")
+
+        rewards_by_parent = {}
+        for reward in Reward.objects.filter(parent__user__username__startswith=f'{prefix}-').order_by('pk'):
+            rewards_by_parent.setdefault(reward.parent_id, []).append(reward)
+        requests = [
+            RewardRequest(child_id=child.pk, reward=rng.choice(rewards_by_parent[parent.pk]))
+            for parent, _, children in families if rewards_by_parent.get(parent.pk)
+            for child in children
+            for _ in range(options['requests'])
+        ]
+        RewardRequest.objects.bulk_create(requests, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(requests)} pending reward requests. Log in as {prefix}-p0 / {options['password']}."
+        ))
+
+    def _create_families(self, rng, options, password):
+        prefix = options['prefix']
+        users = []
+        plan = []
+        for i in range(options['parents']):
+            has_co_parent = rng.random() < options['co_parent_ratio']
+            users.append(User(username=f'{prefix}-p{i}', role='parent', password=password))
+            if has_co_parent:
+                users.append(User(username=f'{prefix}-p{i}-co', role='parent', password=password))
+            for j in range(options['children']):
+                users.append(User(username=f'{prefix}-p{i}-c{j}', role='child', password=password))
+            plan.append((i, has_co_parent))
+        by_name = {user.username: user for user in User.objects.bulk_create(users, batch_size=1000)}
+
+        parents = {
+            parent.user.username: parent
+            for parent in Parent.objects.bulk_create(
+                [Parent(user=user) for user in by_name.values() if user.role == 'parent'], batch_size=1000,
+            )
+        }
+        children = {
+            child.user.username: child
+            for child in Child.objects.bulk_create(
+                [Child(user=user) for user in by_name.values() if user.role == 'child'], batch_size=1000,
+            )
+        }
+
+        families = []
+        links = []
+        rewards = []
+        Through = Child.parents.through
+        for i, has_co_parent in plan:
+            parent = parents[f'{prefix}-p{i}']
+            co_parent = parents.get(f'{prefix}-p{i}-co')
+            kids = [children[f'{prefix}-p{i}-c{j}'] for j in range(options['children'])]
+            for kid in kids:
+                links.append(Through(child_id=kid.pk, parent_id=parent.pk))
+                if co_parent:
+                    links.append(Through(child_id=kid.pk, parent_id=co_parent.pk))
+            for name in rng.sample(REWARD_NAMES, min(options['rewards'], len(REWARD_NAMES))):
+                rewards.append(Reward(parent=parent, name=name, cost=rng.randint(5, 60)))
+            families.append((parent, co_parent, kids))
+        # Fresh users: nobody holds tokens or cached access sets to invalidate
+        Through.objects.bulk_create(links, batch_size=1000)
+        Reward.objects.bulk_create(rewards, batch_size=1000)
+        return families
+
+    @staticmethod
+    def _insert(batch):
+        if not batch:
+            return 0
+        # Balances and daily rollups follow via ScoreTransactionQuerySet.bulk_create
+        ScoreTransaction.objects.bulk_create(batch)
+        return len(batch)
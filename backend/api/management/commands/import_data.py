@@ -0,0 +1,43 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import ImportJob
+from api.tasks import run_import_job
+
+
+class Command(BaseCommand):
+    help = "Bulk import users, rewards or transactions from a CSV/JSON file (see api/imports.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', nargs='?', choices=[kind for kind, _ in ImportJob.KIND_CHOICES])
+        parser.add_argument('path', nargs='?', help='CSV or JSON file readable by the Celery workers.')
+        parser.add_argument('--resume', type=int, metavar='JOB_ID', help='Resume an interrupted job.')
+        parser.add_argument('--sync', action='store_true', help='Run in this process instead of queueing.')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                job = ImportJob.objects.get(pk=options['resume'])
+            except ImportJob.DoesNotExist:
+                raise CommandError(f"Import job {options['resume']} does not exist.")
+        else:
+            if not options['kind'] or not options['path']:
+                raise CommandError('Give a kind and a path, or --resume JOB_ID.')
+            path = os.path.abspath(options['path'])
+            if not os.path.exists(path):
+                raise CommandError(f'{path} does not exist.')
+            job = ImportJob.objects.create(kind=options['kind'], source_path=path)
+
+        if options['sync']:
+            run_import_job(job.pk)
+            job.refresh_from_db()
+            self.stdout.write(self.style.SUCCESS(
+                f'Import job {job.pk} {job.status}: {job.processed_rows} rows, '
+                f'{job.created_rows} created, {job.error_rows} errors.'
+            ))
+            for error in job.row_errors.all()[:20]:
+                self.stdout.write(f'  row {error.row_number}: {error.message}')
+        else:
+            run_import_job.delay(job.pk)
+            self.stdout.write(f'Queued import job {job.pk} ({job.kind}, resumes from row {job.processed_rows}).')
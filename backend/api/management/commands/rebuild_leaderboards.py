@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api import leaderboards
+from api.models import Parent
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the sibling leaderboards from the stored balances, e.g. after "
+        "restoring Redis or running recompute_balances."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('parent_ids', nargs='*', type=int, help='Only these parents\' groups.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Groups rebuilt per query.')
+
+    def handle(self, *args, **options):
+        parent_ids = options['parent_ids'] or list(Parent.objects.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        rebuilt = 0
+        for start in range(0, len(parent_ids), batch_size):
+            rebuilt += leaderboards.rebuild(parent_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} leaderboards."))
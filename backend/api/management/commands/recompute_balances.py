@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.ledger import ledger_totals
+from api.models import Child
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every child's stored score balance from the ledger "
+        "(checkpoint + live transactions) and repair drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify; exit with an error if any balance is out of date.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of children locked and recomputed per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        check_only = options['check']
+        batch_size = options['batch_size']
+        child_ids = list(Child.objects.order_by('pk').values_list('pk', flat=True))
+
+        checked = 0
+        mismatched = []
+        for start in range(0, len(child_ids), batch_size):
+            batch = child_ids[start:start + batch_size]
+            with transaction.atomic():
+                # Lock the batch so ledger writes can't move a balance between
+                # the aggregate and the repair.
+                children = list(Child.objects.select_for_update().filter(pk__in=batch))
+                totals = ledger_totals(batch)
+                stale = []
+                for child in children:
+                    expected = totals.get(child.pk) or 0
+                    if child.balance != expected:
+                        mismatched.append((child.pk, child.balance, expected))
+                        child.balance = expected
+                        stale.append(child)
+                if stale and not check_only:
+                    Child.objects.bulk_update(stale, ['balance'])
+            checked += len(children)
+
+        for child_id, stored, expected in mismatched:
+            self.stdout.write(f"Child {child_id}: stored {stored}, ledger {expected}")
+
+        if check_only and mismatched:
+            raise CommandError(f"{len(mismatched)} of {checked} balances are out of date.")
+
+        verb = 'found' if check_only else 'repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} children, {verb} {len(mismatched)} mismatched balances."
+        ))
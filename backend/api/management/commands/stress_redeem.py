@@ -0,0 +1,88 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from api.ledger import InsufficientPoints, ledger_totals, redeem
+from api.models import Child, Parent, ScoreTransaction, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Race N concurrent redeemers against one child's balance and verify that "
+        "no points are double-spent. Run against PostgreSQL; SQLite serializes writers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--balance', type=int, default=10000, help='Points credited before the run.')
+        parser.add_argument('--cost', type=int, default=7, help='Points debited per redemption.')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic family afterwards.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stderr.write(self.style.WARNING(
+                f"Running on {connection.vendor}; concurrency numbers are not representative."
+            ))
+        workers, balance, cost = options['workers'], options['balance'], options['cost']
+
+        tag = uuid.uuid4().hex[:8]
+        parent = Parent.objects.create(user=User.objects.create_user(f'stress-parent-{tag}', role='parent'))
+        child = Child.objects.create(user=User.objects.create_user(f'stress-child-{tag}', role='child'))
+        child.parents.add(parent)
+        ScoreTransaction.objects.create(child=child, parent=parent, points=balance, transaction_type='add')
+
+        successes = [0] * workers
+        rejections = [0] * workers
+        errors = []
+        start_gate = threading.Barrier(workers)
+
+        def worker(index):
+            try:
+                start_gate.wait()
+                while True:
+                    try:
+                        redeem(child.pk, cost, description='stress test')
+                    except InsufficientPoints:
+                        rejections[index] += 1
+                        return
+                    successes[index] += 1
+            except Exception as exc:  # surfaced in the report below
+                errors.append(repr(exc))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        child.refresh_from_db()
+        redeemed = sum(successes)
+        expected_balance = balance - redeemed * cost
+        ledger_balance = ledger_totals([child.pk]).get(child.pk, 0)
+
+        self.stdout.write(
+            f"{workers} workers, {redeemed} redemptions in {elapsed:.2f}s "
+            f"({redeemed / elapsed:.0f}/s), {sum(rejections)} rejected"
+        )
+        self.stdout.write(
+            f"balance: stored {child.balance}, ledger {ledger_balance}, expected {expected_balance}"
+        )
+
+        if not options['keep']:
+            User.objects.filter(pk__in=[parent.user_id, child.user_id]).delete()
+
+        problems = list(errors)
+        if child.balance != expected_balance or ledger_balance != expected_balance:
+            problems.append('balance mismatch')
+        if child.balance < 0 or child.balance >= cost:
+            problems.append(f'final balance {child.balance} should be in [0, {cost})')
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('No double-spends detected.'))
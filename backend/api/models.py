@@ -1,7 +1,7 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from django.utils import timezone  # <-- missing import fixed
 
 
 class User(AbstractUser):
@@ -10,6 +10,8 @@ class User(AbstractUser):
         ('child', 'Child'),
     )
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    # Stamped into access tokens; bumped to revoke their claims (api/authentication.py)
+    access_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.username} ({self.role})"
@@ -25,15 +27,104 @@ class Parent(models.Model):
 class Child(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='child_profile')
     parents = models.ManyToManyField(Parent, related_name='children')
+    # Running total of score_transactions, maintained by the ledger write paths
+    # (see api/ledger.py). Use `manage.py recompute_balances` to verify/repair.
+    balance = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"Child: {self.user.username}"
 
     @property
     def score_balance(self):
-        from django.db.models import Sum
-        total = self.score_transactions.aggregate(sum=models.Sum('points'))['sum']
-        return total or 0
+        return self.balance
+
+
+class ScoreTransactionQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, update_balances=True, **kwargs):
+        """
+        Bulk insert skips save(), so normalize points here and fold the
+        inserted rows into the children's stored balances atomically.
+        Pass update_balances=False when the caller already moved the balances.
+        An explicitly set created_at (imported history) is inserted as is.
+        """
+        from .ledger import apply_balance_deltas, ledger_deltas
+        from .signals import ledger_changed
+
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.points = ScoreTransaction.normalize_points(obj.transaction_type, obj.points)
+            if obj.created_at is None:
+                obj.created_at = now
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            if update_balances:
+                apply_balance_deltas(ledger_deltas(added=objs), using=self.db)
+            ledger_changed.send(sender=ScoreTransaction, added=objs, removed=[], using=self.db)
+        return created
+
+    def delete(self, update_balances=True):
+        """
+        Delete rows and take their points back out of the balances.
+        update_balances=False is for moving rows elsewhere (ledger
+        compaction): balances stay put and no ledger change is signalled.
+        """
+        from .ledger import apply_balance_deltas, ledger_deltas
+        from .signals import ledger_changed
+
+        with transaction.atomic(using=self.db):
+            if update_balances:
+                removed = list(self.only(*ScoreTransaction.LEDGER_FIELDS))
+            result = super().delete()
+            if update_balances:
+                apply_balance_deltas(ledger_deltas(removed=removed), using=self.db)
+                ledger_changed.send(sender=ScoreTransaction, added=[], removed=removed, using=self.db)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def update(self, **kwargs):
+        """
+        UPDATE that keeps balances and rollups in step when it touches the
+        ledger (child, points, transaction_type, created_at), like save().
+        """
+        if not ScoreTransaction.LEDGER_UPDATE_FIELDS & set(kwargs):
+            return super().update(**kwargs)
+        return self._rewrite(lambda: super(ScoreTransactionQuerySet, self).update(**kwargs), set(kwargs))
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        # Django writes each batch with self.update(), which keeps the ledger in step
+        objs = list(objs)
+        if 'points' in fields:
+            for obj in objs:
+                obj.points = ScoreTransaction.normalize_points(obj.transaction_type, obj.points)
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    bulk_update.alters_data = True
+
+    def _rewrite(self, write, fields):
+        """Run `write` over these rows, then apply the difference between their old and new versions."""
+        from .ledger import apply_balance_deltas, ledger_deltas
+        from .signals import ledger_changed
+
+        with transaction.atomic(using=self.db):
+            removed = list(self.select_for_update().only(*ScoreTransaction.LEDGER_FIELDS))
+            result = write()
+            # A plain QuerySet, so these UPDATEs don't come back through here
+            rows = models.QuerySet(ScoreTransaction, using=self.db).filter(pk__in=[txn.pk for txn in removed])
+            if {'points', 'transaction_type'} & fields:
+                # Same signs as normalize_points(): positive for add, negative otherwise
+                rows.filter(
+                    models.Q(transaction_type='add', points__lt=0)
+                    | models.Q(transaction_type__in=['subtract', 'redeem'], points__gt=0)
+                ).update(points=-models.F('points'))
+            added = list(rows.only(*ScoreTransaction.LEDGER_FIELDS))
+            apply_balance_deltas(ledger_deltas(added=added, removed=removed), using=self.db)
+            ledger_changed.send(sender=ScoreTransaction, added=added, removed=removed, using=self.db)
+        return result
 
 
 class ScoreTransaction(models.Model):
@@ -48,20 +139,140 @@ class ScoreTransaction(models.Model):
     points = models.IntegerField()  # Positive for add, negative for subtract/redeem
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPE_CHOICES)
     description = models.CharField(max_length=255, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, which would overwrite the created_at of imported and
+    # buffered rows and force a second UPDATE after bulk inserts
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Set by write-behind ingestion (api/ingest.py) so retried awards count once
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
+    objects = ScoreTransactionQuerySet.as_manager()
+
+    # Loaded for rows leaving the ledger, so the ledger_changed receivers can
+    # undo their effect.
+    LEDGER_FIELDS = ('child', 'points', 'transaction_type', 'created_at')
+    # Fields an UPDATE must not change behind the balances' and rollups' back
+    LEDGER_UPDATE_FIELDS = {'child', 'child_id', 'points', 'transaction_type', 'created_at'}
+
+    class Meta:
+        indexes = [
+            # Per-child history, newest first; backs the ledger keyset pagination.
+            models.Index(fields=['child', 'created_at', 'id'], name='scoretxn_child_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['child', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='scoretxn_child_idempotency_uniq',
+            ),
+        ]
+
+    @staticmethod
+    def normalize_points(transaction_type, points):
+        # Positive for add, negative for subtract/redeem
+        if transaction_type == 'add' and points < 0:
+            return abs(points)
+        elif transaction_type in ['subtract', 'redeem'] and points > 0:
+            return -abs(points)
+        return points
 
     def save(self, *args, **kwargs):
-        # Normalize points based on type
-        if self.transaction_type == 'add' and self.points < 0:
-            self.points = abs(self.points)
-        elif self.transaction_type in ['subtract', 'redeem'] and self.points > 0:
-            self.points = -abs(self.points)
-        super().save(*args, **kwargs)
+        from .ledger import apply_balance_deltas, ledger_deltas
+        from .signals import ledger_changed
+
+        self.points = self.normalize_points(self.transaction_type, self.points)
+        using = kwargs.get('using') or router.db_for_write(ScoreTransaction, instance=self)
+        with transaction.atomic(using=using):
+            previous = None
+            if self.pk is not None:
+                previous = (
+                    ScoreTransaction.objects.using(using).select_for_update()
+                    .filter(pk=self.pk).only(*self.LEDGER_FIELDS).first()
+                )
+            super().save(*args, **kwargs)
+            removed = [previous] if previous is not None else []
+            apply_balance_deltas(ledger_deltas(added=[self], removed=removed), using=using)
+            ledger_changed.send(sender=ScoreTransaction, added=[self], removed=removed, using=using)
+
+    def delete(self, *args, **kwargs):
+        from .ledger import apply_balance_deltas, ledger_deltas
+        from .signals import ledger_changed
+
+        using = kwargs.get('using') or router.db_for_write(ScoreTransaction, instance=self)
+        with transaction.atomic(using=using):
+            removed = list(
+                ScoreTransaction.objects.using(using).select_for_update()
+                .filter(pk=self.pk).only(*self.LEDGER_FIELDS)
+            )
+            result = super().delete(*args, **kwargs)
+            apply_balance_deltas(ledger_deltas(removed=removed), using=using)
+            ledger_changed.send(sender=ScoreTransaction, added=[], removed=removed, using=using)
+        return result
 
     def __str__(self):
         return f"{self.transaction_type} {self.points} for {self.child.user.username}"
 
 
+class ArchivedScoreTransaction(models.Model):
+    """
+    A ScoreTransaction moved out of the hot table by ledger compaction.
+
+    Keeps the original primary key so history pagination, which orders by
+    (created_at, id), continues seamlessly from live rows into archived ones.
+    """
+    id = models.IntegerField(primary_key=True)
+    child = models.ForeignKey(Child, on_delete=models.CASCADE, related_name='archived_score_transactions')
+    parent = models.ForeignKey(Parent, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    points = models.IntegerField()
+    transaction_type = models.CharField(max_length=10, choices=ScoreTransaction.TRANSACTION_TYPE_CHOICES)
+    description = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['child', 'created_at', 'id'], name='archivedtxn_child_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"archived {self.transaction_type} {self.points} for child {self.child_id}"
+
+
+class LedgerCheckpoint(models.Model):
+    """
+    Sum of a child's archived transactions, i.e. their balance as of `cutoff`.
+
+    Invariant: Child.balance == checkpoint.balance + SUM(live score_transactions).
+    """
+    child = models.OneToOneField(Child, on_delete=models.CASCADE, related_name='ledger_checkpoint')
+    cutoff = models.DateTimeField()
+    balance = models.IntegerField(default=0)
+    archived_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Checkpoint(child {self.child_id}: {self.balance} as of {self.cutoff:%Y-%m-%d})"
+
+
+class DailyPointsRollup(models.Model):
+    """
+    Points per child, day and transaction type, maintained incrementally from
+    ledger writes (api/rollups.py) so charts never scan the ledger.
+    """
+    child = models.ForeignKey(Child, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    transaction_type = models.CharField(max_length=10, choices=ScoreTransaction.TRANSACTION_TYPE_CHOICES)
+    points = models.IntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['child', 'day', 'transaction_type'], name='rollup_child_day_type_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Rollup(child {self.child_id}, {self.day}, {self.transaction_type}: {self.points})"
+
+
 class Reward(models.Model):
     parent = models.ForeignKey(Parent, on_delete=models.CASCADE, related_name='rewards')
     name = models.CharField(max_length=100)
@@ -80,26 +291,67 @@ class RewardRequest(models.Model):
     approved_at = models.DateTimeField(null=True, blank=True)
     approved_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='approved_requests')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['child', 'requested_at'], name='rewardreq_child_requested_idx'),
+        ]
+
     def approve(self, approver):
-        if self.approved:
-            raise ValueError("This request has already been approved.")
-
-        if self.child.score_balance < self.reward.cost:
-            raise ValueError("Insufficient score")
-
-        # Deduct score with a transaction
-        ScoreTransaction.objects.create(
-            child=self.child,
-            parent=None,  # approval doesn’t require a parent directly
-            points=-self.reward.cost,
-            transaction_type='redeem',
-            description=f'Reward redeemed: {self.reward.name} (approved)'
-        )
+        """
+        Approve and deduct the reward's cost. Raises ValueError if already
+        approved or the child can't afford it (see api.ledger).
+        """
+        from .ledger import approve_reward_request
 
-        self.approved = True
-        self.approved_at = timezone.now()
-        self.approved_by = approver
-        self.save()
+        approve_reward_request(
+            self, approver.pk, description=f'Reward redeemed: {self.reward.name} (approved)'
+        )
 
     def __str__(self):
         return f"Request({self.child.user.username} -> {self.reward.name}, approved={self.approved})"
+
+
+class ImportJob(models.Model):
+    """
+    A bulk import of users, rewards or historical transactions from a CSV or
+    JSON file (api/imports.py). Progress is committed with every batch, so a
+    crashed job resumes from `processed_rows`.
+    """
+    KIND_CHOICES = (
+        ('users', 'Users'),
+        ('rewards', 'Rewards'),
+        ('transactions', 'Transactions'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    source_path = models.CharField(max_length=500)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_rows = models.PositiveIntegerField(default=0)
+    error_rows = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"ImportJob({self.kind} {self.source_path}: {self.status}, {self.processed_rows} rows)"
+
+
+class ImportRowError(models.Model):
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name='row_errors')
+    row_number = models.PositiveIntegerField()  # 1-based, excluding the CSV header
+    data = models.JSONField()
+    message = models.TextField()
+
+    class Meta:
+        ordering = ['row_number']
+
+    def __str__(self):
+        return f"Row {self.row_number}: {self.message}"
@@ -0,0 +1,158 @@
+import base64
+import binascii
+import heapq
+import itertools
+
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first keyset pagination on (timestamp, id).
+
+    The cursor is the (timestamp, id) of the last row served, and the next
+    page is the rows below it by row-value comparison, so every page is an
+    index range scan no matter how deep into history the client is. Pair it
+    with an index on (<scope_field>, <timestamp_field>, id).
+
+    Views whose queryset spans several scopes (a parent's children) define
+    get_keyset_scopes(). Each scope then gets its own LIMITed range scan; one
+    UNION ALL query merges their keys and a second loads the page by id.
+    Without the split, an OR of scopes can't walk the index in order and the
+    database sorts the whole family's history for every page.
+
+    Takes model querysets. Views serving other rows (values() projections,
+    see api/projections.py) define get_page_rows(queryset) to load the page
+    once its rows are chosen; those rows must include the timestamp and id.
+
+    If the view defines get_archive_queryset(), each page is merged by
+    (timestamp, id) from the main queryset and the archive, so compacted
+    history pages on without the client noticing, even where the two overlap.
+    """
+    timestamp_field = 'created_at'
+    scope_field = 'child'
+    cursor_query_param = 'cursor'
+    load = list
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        get_keyset_scopes = getattr(view, 'get_keyset_scopes', None)
+        scopes = get_keyset_scopes() if get_keyset_scopes is not None else None
+        self.load = getattr(view, 'get_page_rows', list)
+        rows = self.fetch(queryset, cursor, self.page_size + 1, scopes)
+        get_archive_queryset = getattr(view, 'get_archive_queryset', None)
+        if get_archive_queryset is not None:
+            archived = self.fetch(get_archive_queryset(), cursor, self.page_size + 1, scopes)
+            merged = heapq.merge(rows, archived, key=self.row_key, reverse=True)
+            rows = list(itertools.islice(merged, self.page_size + 1))
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def fetch(self, queryset, cursor, limit, scopes=None):
+        """Up to `limit` rows below `cursor`; `scopes` are the scope_field values queryset spans."""
+        queryset = queryset.order_by(f'-{self.timestamp_field}', '-pk')
+        if scopes is None:
+            return self.load(self._below(queryset, cursor)[:limit])
+        scopes = sorted(scopes)
+        if not scopes:
+            return []
+        if len(scopes) == 1:
+            return self.load(self._below(queryset, cursor, scopes[0])[:limit])
+        return self.load(queryset.filter(pk__in=self._merged_keys(queryset, cursor, limit, scopes)))
+
+    def _below(self, queryset, cursor, scope=None):
+        """
+        Rows of `scope` (if given) below `cursor`, as one row-value comparison
+        on the index columns: (scope, timestamp, id) < (scope, cursor).
+        """
+        if scope is not None:
+            queryset = queryset.filter(**{self.scope_field: scope})
+        if cursor is None:
+            return queryset
+        timestamp, pk = cursor
+        connection = connections[queryset.db]
+        meta = queryset.model._meta
+        qn = connection.ops.quote_name
+        columns = [meta.get_field(self.timestamp_field).column, meta.pk.column]
+        params = [connection.ops.adapt_datetimefield_value(timestamp), pk]
+        if scope is not None:
+            columns.insert(0, meta.get_field(self.scope_field).column)
+            params.insert(0, scope)
+        row = ', '.join(f'{qn(meta.db_table)}.{qn(column)}' for column in columns)
+        placeholders = ', '.join(['%s'] * len(params))
+        return queryset.extra(where=[f'({row}) < ({placeholders})'], params=params)
+
+    def _merged_keys(self, queryset, cursor, limit, scopes):
+        """Ids of the top `limit` rows across `scopes`: a LIMITed index scan per scope, merged."""
+        connection = connections[queryset.db]
+        parts, params = [], []
+        for index, scope in enumerate(scopes):
+            keys = self._below(queryset, cursor, scope).values_list('pk', self.timestamp_field)[:limit]
+            sql, scope_params = keys.query.get_compiler(using=keys.db).as_sql()
+            # Wrapped, since compound members can't carry their own ORDER BY/LIMIT on every backend
+            parts.append(f'SELECT * FROM ({sql}) {connection.ops.quote_name(f"keys_{index}")}')
+            params.extend(scope_params)
+        sql = ' UNION ALL '.join(parts) + f' ORDER BY 2 DESC, 1 DESC LIMIT {int(limit)}'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def row_key(self, row):
+        """(timestamp, id) of a page row, model instance or values() dict (api/projections.py)."""
+        if isinstance(row, dict):
+            return row[self.timestamp_field], row['id']
+        return getattr(row, self.timestamp_field), row.pk
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        timestamp, pk = self.row_key(self.page[-1])
+        raw = f'{timestamp.isoformat()}|{pk}'
+        cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode()).decode()
+            timestamp, pk = raw.rsplit('|', 1)
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound('Invalid cursor.')
+        if timestamp is None:
+            raise NotFound('Invalid cursor.')
+        return timestamp, pk
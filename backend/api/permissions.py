@@ -1,22 +1,23 @@
-
 from rest_framework import permissions
 
+from .access import get_access
+from .models import Child
+
+
 class IsParent(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.role == 'parent'
+        return request.user and request.user.is_authenticated and get_access(request).is_parent
 
 class IsChild(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.role == 'child'
+        return request.user and request.user.is_authenticated and get_access(request).is_child
 
 class IsOwnerOrParent(permissions.BasePermission):
     """
     Allow child to view only their own data,
     allow parent to access related child data.
+    Works on Child objects, or anything with a child_id.
     """
     def has_object_permission(self, request, view, obj):
-        if request.user.role == 'parent':
-            return obj.parents.filter(user=request.user).exists()
-        elif request.user.role == 'child':
-            return obj.user == request.user
-        return False
+        child_id = obj.pk if isinstance(obj, Child) else getattr(obj, 'child_id', None)
+        return get_access(request).can_see_child(child_id)
@@ -0,0 +1,215 @@
+"""
+Request profiling: where an API request spends its time.
+
+ProfilingMiddleware times every request into per-view latency histograms.
+A sampled share of requests (PROFILING_SAMPLE_RATE) is also instrumented:
+every query runs through a DB execute wrapper that counts it and its time,
+and serializer output (BaseSerializer.data) is timed net of the queries it
+triggers. Sampled responses carry a Server-Timing header
+(db, serialize, app, total) and feed the query/DB/serializer metrics.
+
+Metrics live in process memory and are served in the Prometheus text format
+by metrics_view (/metrics/); scrape every worker process, or run a single
+one per scrape target.
+"""
+import bisect
+import contextvars
+import hmac
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """Query and serializer timings of one sampled request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self._serializing = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # DB execute wrapper, see connection.execute_wrapper()
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+
+class Registry:
+    """Per-(view, method) request metrics for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def record(self, view, method, status, seconds, profile=None):
+        key = (view, method)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            status_key = (view, method, str(status))
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+            if profile is not None:
+                self.queries.setdefault(key, Histogram(QUERY_BUCKETS)).observe(profile.queries)
+                self.db_seconds[key] = self.db_seconds.get(key, 0.0) + profile.db_seconds
+                self.serializer_seconds[key] = self.serializer_seconds.get(key, 0.0) + profile.serializer_seconds
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.latency = {}
+        self.queries = {}
+        self.responses = {}
+        self.db_seconds = {}
+        self.serializer_seconds = {}
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = []
+            self._histogram(lines, 'api_request_duration_seconds', 'Request latency, all requests.', self.latency)
+            self._histogram(lines, 'api_request_queries', 'Database queries per sampled request.', self.queries)
+            self._counter(lines, 'api_responses_total', 'Responses by status code.', self.responses,
+                          ('view', 'method', 'status'))
+            self._counter(lines, 'api_request_db_seconds_total', 'Database time of sampled requests.',
+                          self.db_seconds)
+            self._counter(lines, 'api_request_serializer_seconds_total',
+                          'Serializer time of sampled requests, excluding the queries it ran.',
+                          self.serializer_seconds)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _labels(names, values, **extra):
+        pairs = list(zip(names, values)) + list(extra.items())
+        return ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+    def _histogram(self, lines, name, help_text, histograms):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for key, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                cumulative += count
+                labels = self._labels(('view', 'method'), key, le=bound)
+                lines.append(f'{name}_bucket{{{labels}}} {cumulative}')
+            labels = self._labels(('view', 'method'), key)
+            lines.append(f'{name}_sum{{{labels}}} {histogram.total}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+    def _counter(self, lines, name, help_text, values, label_names=('view', 'method')):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for key, value in sorted(values.items()):
+            lines.append(f'{name}{{{self._labels(label_names, key)}}} {value}')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route or 'unknown'
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            return self.get_response(request)
+
+        sampled = random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 0.01)
+        profile = RequestProfile() if sampled else None
+        start = time.perf_counter()
+        if profile is None:
+            response = self.get_response(request)
+        else:
+            token = _current.set(profile)
+            try:
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(profile))
+                    response = self.get_response(request)
+            finally:
+                _current.reset(token)
+        elapsed = time.perf_counter() - start
+
+        registry.record(_view_name(request), request.method, response.status_code, elapsed, profile)
+        if profile is not None:
+            app = max(elapsed - profile.db_seconds - profile.serializer_seconds, 0.0)
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={profile.db_seconds * 1000:.1f};desc="{profile.queries} queries"',
+                f'serialize;dur={profile.serializer_seconds * 1000:.1f}',
+                f'app;dur={app * 1000:.1f}',
+                f'total;dur={elapsed * 1000:.1f}',
+            ])
+        return response
+
+
+def instrument_serializers():
+    """Time BaseSerializer.data for sampled requests (called from ApiConfig.ready)."""
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data
+    if getattr(data.fget, 'profiled', False):
+        return
+
+    def profiled_data(serializer):
+        profile = _current.get()
+        if profile is None or profile._serializing:
+            return data.fget(serializer)
+        profile._serializing += 1
+        start, db_start = time.perf_counter(), profile.db_seconds
+        try:
+            return data.fget(serializer)
+        finally:
+            profile._serializing -= 1
+            # Lazy querysets evaluated while serializing count as DB time
+            profile.serializer_seconds += time.perf_counter() - start - (profile.db_seconds - db_start)
+
+    profiled_data.profiled = True
+    BaseSerializer.data = property(profiled_data)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; requires `Bearer <METRICS_TOKEN>`, and is off while that is unset."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    if not token or not hmac.compare_digest(authorization, f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
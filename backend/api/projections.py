@@ -0,0 +1,156 @@
+"""
+Fast read path for list endpoints.
+
+A Projection reads only the columns its fields need with values() and
+builds each row's JSON straight from those flat dicts. There are no model
+instances and no per-row nested serializers, yet the output has the same
+shape as the corresponding ModelSerializer. `?fields=a,b` (parse_fields)
+trims the response to those top-level fields, and drops the joins and
+columns behind the rest.
+
+Writes and single-object reads still go through the serializers.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .models import Child
+
+_datetime = serializers.DateTimeField()
+
+
+def _timestamp(value):
+    # Same rendering (timezone, format) as the serializers' DateTimeField
+    return _datetime.to_representation(value) if value is not None else None
+
+
+def _user(row, prefix):
+    return {
+        'id': row[f'{prefix}id'],
+        'username': row[f'{prefix}username'],
+        'email': row[f'{prefix}email'],
+        'role': row[f'{prefix}role'],
+    }
+
+
+def _user_columns(prefix):
+    return tuple(f'{prefix}{name}' for name in ('id', 'username', 'email', 'role'))
+
+
+def _parent(row, prefix='parent'):
+    # Mirrors ParentSerializer: {"id", "user": UserSerializer}
+    if row[f'{prefix}_id'] is None:
+        return None
+    return {'id': row[f'{prefix}_id'], 'user': _user(row, f'{prefix}__user__')}
+
+
+PARENT_COLUMNS = ('parent_id',) + _user_columns('parent__user__')
+
+
+class Field:
+    def __init__(self, columns, build=None):
+        self.columns = columns
+        # Default: the single column's value as is
+        self.build = build or (lambda row, column=columns[0]: row[column])
+
+
+class Projection:
+    """
+    `fields` maps output names to Fields, in serializer order. `always` lists
+    columns fetched regardless of ?fields= (e.g. the pagination cursor's).
+    """
+
+    def __init__(self, fields, always=('id',), after=None):
+        self.fields = fields
+        self.always = always
+        # after(rows, items, fields): fills fields needing another query (to-many)
+        self.after = after
+
+    def columns(self, fields):
+        columns = dict.fromkeys(self.always)
+        for name in fields:
+            columns.update(dict.fromkeys(self.fields[name].columns))
+        return list(columns)
+
+    def values(self, queryset, fields):
+        """`queryset` reduced to the columns behind `fields`; it yields dicts."""
+        return queryset.prefetch_related(None).values(*self.columns(fields))
+
+    def render(self, rows, fields):
+        items = [{name: self.fields[name].build(row) for name in fields} for row in rows]
+        if self.after is not None:
+            self.after(rows, items, fields)
+        return items
+
+    def list(self, queryset, fields):
+        return self.render(list(self.values(queryset, fields)), fields)
+
+
+def parse_fields(request, projection, param='fields'):
+    """The ?fields= selection, in the serializer's field order; all fields by default."""
+    raw = request.query_params.get(param)
+    if not raw:
+        return list(projection.fields)
+    wanted = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = wanted - set(projection.fields)
+    if unknown:
+        raise ValidationError({param: (
+            f'Unknown field(s): {", ".join(sorted(unknown))}. '
+            f'Choose from: {", ".join(projection.fields)}.'
+        )})
+    return [name for name in projection.fields if name in wanted]
+
+
+SCORE_TRANSACTION = Projection({
+    'id': Field(('id',)),
+    'child': Field(('child_id',)),
+    'parent': Field(PARENT_COLUMNS, _parent),
+    'points': Field(('points',)),
+    'transaction_type': Field(('transaction_type',)),
+    'description': Field(('description',)),
+    'created_at': Field(('created_at',), lambda row: _timestamp(row['created_at'])),
+}, always=('id', 'created_at'))
+
+
+REWARD = Projection({
+    'id': Field(('id',)),
+    'parent': Field(PARENT_COLUMNS, _parent),
+    'name': Field(('name',)),
+    'cost': Field(('cost',)),
+    'description': Field(('description',)),
+})
+
+
+def _child_parents(rows, items, fields):
+    # ChildSerializer.parents: one query for every row's parents and their users
+    if 'parents' not in fields:
+        return
+    by_child = {row['id']: [] for row in rows}
+    links = (
+        Child.parents.through.objects.filter(child_id__in=list(by_child))
+        .order_by('parent_id')
+        .values('child_id', *PARENT_COLUMNS)
+    )
+    for link in links:
+        by_child[link['child_id']].append(_parent(link))
+    for row, item in zip(rows, items):
+        item['parents'] = by_child[row['id']]
+
+
+CHILD = Projection({
+    'id': Field(('id',)),
+    'user': Field(_user_columns('user__'), lambda row: _user(row, 'user__')),
+    'parents': Field((), lambda row: None),
+    'score_balance': Field(('balance',)),
+}, after=_child_parents)
+
+
+REWARD_REQUEST = Projection({
+    'id': Field(('id',)),
+    'child': Field(('child_id',)),
+    'child_name': Field(('child__user__username',)),
+    'reward': Field(('reward_id',)),
+    'reward_name': Field(('reward__name',)),
+    'requested_at': Field(('requested_at',), lambda row: _timestamp(row['requested_at'])),
+    'approved': Field(('approved',)),
+    'approved_at': Field(('approved_at',), lambda row: _timestamp(row['approved_at'])),
+})
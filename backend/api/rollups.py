@@ -0,0 +1,134 @@
+"""
+Daily points rollups: (child, day, transaction_type) -> points, count.
+
+Kept current by the ledger_changed receiver in api/signals.py, inside the
+same transaction as the ledger write. rebuild_rollups() recomputes them
+from the live and archived ledger for backfills and repairs.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArchivedScoreTransaction, DailyPointsRollup, ScoreTransaction
+
+BUCKETS = ('day', 'week')
+
+
+def ledger_day(moment):
+    if timezone.is_aware(moment):
+        moment = timezone.localtime(moment)
+    return moment.date()
+
+
+def apply_rollup_deltas(added=(), removed=(), using=None):
+    deltas = defaultdict(lambda: [0, 0])
+    for txn, sign in [(txn, 1) for txn in added] + [(txn, -1) for txn in removed]:
+        delta = deltas[(txn.child_id, ledger_day(txn.created_at), txn.transaction_type)]
+        delta[0] += sign * txn.points
+        delta[1] += sign
+    # Sorted, so concurrent writers lock rollup rows in the same order
+    rows = sorted((key, delta) for key, delta in deltas.items() if any(delta))
+    if not rows:
+        return
+
+    connection = connections[using or router.db_for_write(DailyPointsRollup)]
+    qn = connection.ops.quote_name
+    meta = DailyPointsRollup._meta
+    table = qn(meta.db_table)
+    child, day, transaction_type, points, count = (
+        qn(meta.get_field(name).column) for name in ('child', 'day', 'transaction_type', 'points', 'count')
+    )
+    # One set-based upsert (PostgreSQL, SQLite >= 3.24) instead of an UPDATE,
+    # and on a miss an INSERT, per key
+    upsert = (
+        f'INSERT INTO {table} ({child}, {day}, {transaction_type}, {points}, {count}) VALUES {{}} '
+        f'ON CONFLICT ({child}, {day}, {transaction_type}) DO UPDATE SET '
+        f'{points} = {table}.{points} + EXCLUDED.{points}, {count} = {table}.{count} + EXCLUDED.{count}'
+    )
+    batch_size = connection.ops.bulk_batch_size(['child', 'day', 'transaction_type', 'points', 'count'], rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            params = []
+            for (child_id, day_value, type_value), (points_delta, count_delta) in batch:
+                params += [child_id, connection.ops.adapt_datefield_value(day_value), type_value, points_delta, count_delta]
+            cursor.execute(upsert.format(', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))), params)
+
+
+def _aggregate(queryset):
+    return (
+        queryset.annotate(day=TruncDate('created_at'))
+        .values('child_id', 'day', 'transaction_type')
+        .annotate(total=Sum('points'), rows=Count('id'))
+        .order_by()
+    )
+
+
+def rebuild_rollups(child_ids=None, since=None):
+    """Recompute rollups (optionally for some children / from a day on). Returns rows written."""
+    scope = {}
+    if child_ids is not None:
+        scope['child_id__in'] = child_ids
+    ledger_scope = dict(scope)
+    if since is not None:
+        start = datetime.combine(since, time.min)
+        ledger_scope['created_at__gte'] = timezone.make_aware(start) if settings.USE_TZ else start
+
+    totals = defaultdict(lambda: [0, 0])
+    for model in (ArchivedScoreTransaction, ScoreTransaction):
+        for row in _aggregate(model.objects.filter(**ledger_scope)):
+            key = (row['child_id'], row['day'], row['transaction_type'])
+            totals[key][0] += row['total']
+            totals[key][1] += row['rows']
+
+    with transaction.atomic():
+        stale = DailyPointsRollup.objects.filter(**scope)
+        if since is not None:
+            stale = stale.filter(day__gte=since)
+        stale.delete()
+        DailyPointsRollup.objects.bulk_create([
+            DailyPointsRollup(child_id=child_id, day=day, transaction_type=transaction_type, points=points, count=count)
+            for (child_id, day, transaction_type), (points, count) in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def _period_start(day, bucket):
+    return day - timedelta(days=day.weekday()) if bucket == 'week' else day
+
+
+def points_series(child_ids, start, end, bucket='day'):
+    """
+    Dense per-child series of points by type between `start` and `end`
+    (inclusive dates), read only from the rollups.
+    """
+    step = timedelta(days=7 if bucket == 'week' else 1)
+    periods = []
+    period = _period_start(start, bucket)
+    while period <= end:
+        periods.append(period)
+        period += step
+
+    empty = {transaction_type: 0 for transaction_type, _ in ScoreTransaction.TRANSACTION_TYPE_CHOICES}
+    series = {child_id: {period: dict(empty) for period in periods} for child_id in child_ids}
+    rows = DailyPointsRollup.objects.filter(
+        child_id__in=child_ids, day__gte=start, day__lte=end,
+    ).values_list('child_id', 'day', 'transaction_type', 'points')
+    for child_id, day, transaction_type, points in rows:
+        series[child_id][_period_start(day, bucket)][transaction_type] += points
+
+    return [
+        {
+            'child': child_id,
+            'points': [
+                {'period': period, 'net': sum(totals.values()), **totals}
+                for period, totals in series[child_id].items()
+            ],
+        }
+        for child_id in child_ids
+    ]
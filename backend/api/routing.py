@@ -0,0 +1,114 @@
+"""
+Read-replica routing.
+
+Reads go to the primary unless a request opts in. The viewsets' list and
+retrieve actions do (ReplicaReadMixin) once the caller has passed
+authentication and permissions. One replica is picked per request, so all
+of its reads see a single snapshot. Writes, transactions with
+select_for_update() and everything outside those actions stay on the
+primary.
+
+Replicas lag behind the primary, so reads fall back to it in two cases:
+  - the caller wrote anything in the last DATABASE_REPLICA_LAG_SECONDS
+    (read-your-writes: ReplicaRoutingMiddleware pins the user after any
+    unsafe request);
+  - the response's change versions (api/conditional.py) moved within that
+    window, so a fresh ETag is never put on stale replica data.
+Data that fills shared caches is read with primary() for the same reason.
+"""
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_KEY = 'db-primary-pin:user:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def _lag_seconds():
+    return getattr(settings, 'DATABASE_REPLICA_LAG_SECONDS', 5)
+
+
+def use_replica():
+    """Send the rest of this request's reads to a replica, if any is configured."""
+    replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+    if replicas:
+        _read_alias.set(random.choice(replicas))
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside the block."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def pin_to_primary(user_id):
+    cache.set(PIN_KEY.format(user_id), 1, _lag_seconds())
+
+
+def is_pinned(user_id):
+    return cache.get(PIN_KEY.format(user_id)) is not None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Explicitly, or instances loaded from a replica would be saved back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Scopes the replica choice to one request and pins users who write."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        if request.method not in SAFE_METHODS:
+            user = getattr(request, 'user', None)  # set by DRF authentication
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return response
+
+
+class ReplicaReadMixin:
+    """Serve `replica_actions` from a replica when that can't read stale data."""
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS or getattr(self, 'action', None) not in self.replica_actions:
+            return
+        if not getattr(settings, 'DATABASE_REPLICAS', ()):
+            return
+        # Max change version of this response's scopes, set by ConditionalGetMixin
+        changed_at = getattr(self, 'conditional_changed_at', None)
+        if changed_at is not None and time.time_ns() - changed_at < _lag_seconds() * 10 ** 9:
+            return
+        if request.user.is_authenticated and is_pinned(request.user.pk):
+            return
+        use_replica()
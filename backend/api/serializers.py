@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .access import get_access
 from .models import User, Parent, Child, ScoreTransaction, Reward, RewardRequest
 
 
@@ -37,11 +38,33 @@ class ScoreTransactionSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         request = self.context.get('request')
-        if request and hasattr(request, 'user') and request.user.role == 'parent':
-            validated_data['parent'] = request.user.parent_profile
+        if request and hasattr(request, 'user') and get_access(request).is_parent:
+            validated_data['parent_id'] = get_access(request).parent_id
         return super().create(validated_data)
 
 
+class ScoreTransactionBulkItemSerializer(serializers.Serializer):
+    """
+    One entry of a bulk award. `child` is a plain id: ownership of every
+    child in the batch is checked by the view in a single query rather than
+    one lookup per item.
+    """
+    child = serializers.IntegerField(min_value=1)
+    points = serializers.IntegerField()
+    transaction_type = serializers.ChoiceField(choices=ScoreTransaction.TRANSACTION_TYPE_CHOICES)
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+
+
+class ScoreTransactionIngestItemSerializer(ScoreTransactionBulkItemSerializer):
+    """
+    One buffered award (api/ingest.py). Redemptions need a balance check at
+    write time, so only add/subtract can be buffered. Resending an award with
+    the same idempotency_key never counts it twice.
+    """
+    transaction_type = serializers.ChoiceField(choices=['add', 'subtract'], default='add')
+    idempotency_key = serializers.CharField(max_length=64, required=False)
+
+
 class RewardSerializer(serializers.ModelSerializer):
     parent = ParentSerializer(read_only=True)
 
@@ -51,8 +74,8 @@ class RewardSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         request = self.context.get('request')
-        if request and hasattr(request, 'user') and request.user.role == 'parent':
-            validated_data['parent'] = request.user.parent_profile
+        if request and hasattr(request, 'user') and get_access(request).is_parent:
+            validated_data['parent_id'] = get_access(request).parent_id
         return super().create(validated_data)
 
 
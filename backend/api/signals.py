@@ -0,0 +1,148 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from . import authentication, cache, conditional, events, leaderboards, ledger, rollups
+from .models import Child, Parent, Reward, RewardRequest, ScoreTransaction, User
+
+# Sent inside the writing transaction whenever ScoreTransaction rows are
+# inserted, updated or deleted, including bulk paths that skip save():
+#   added: rows now in the ledger; removed: rows (or prior versions) gone from it.
+# Receivers with side effects outside the database should defer to on_commit.
+ledger_changed = Signal()
+
+
+@receiver([post_save, post_delete], sender=Reward)
+def reward_changed(sender, instance, **kwargs):
+    cache.invalidate_parent_catalogs([instance.parent_id])
+    conditional.bump([conditional.parent_scope(instance.parent_id)])
+
+
+@receiver(pre_delete, sender=Reward)
+def reward_deleted(sender, instance, **kwargs):
+    # Its requests are deleted with it; one query for all of their families
+    child_ids = RewardRequest.objects.filter(reward=instance).values_list('child_id', flat=True)
+    conditional.bump(conditional.child_scopes(child_ids))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Catalog payloads embed the owning parent's user; logins only touch last_login.
+    if update_fields and set(update_fields) <= {'last_login', 'password'}:
+        return
+    # is_active is only checked when the access version isn't cached, so a
+    # deactivated user's tokens would keep working until it expired
+    authentication.forget_access_versions([instance.pk])
+    scopes = [conditional.user_scope(instance.pk)]
+    if instance.role == 'parent':
+        parent_ids = list(Parent.objects.filter(user=instance).values_list('pk', flat=True))
+        cache.invalidate_parent_catalogs(parent_ids)
+        # Shown wherever the parent is: their family, co-parents' child lists, the directory
+        child_ids = Child.parents.through.objects.filter(parent_id__in=parent_ids).values_list('child_id', flat=True)
+        scopes += [conditional.parent_scope(parent_id) for parent_id in parent_ids]
+        scopes += conditional.child_scopes(child_ids) + [conditional.DIRECTORY_SCOPE]
+    elif instance.role == 'child':
+        scopes += conditional.child_scopes(Child.objects.filter(user=instance).values_list('pk', flat=True))
+    conditional.bump(scopes)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    authentication.forget_access_versions([instance.pk])
+
+
+@receiver(post_save, sender=Parent)
+def parent_saved(sender, instance, created, **kwargs):
+    if created:
+        conditional.bump([conditional.DIRECTORY_SCOPE])
+
+
+@receiver(pre_delete, sender=Parent)
+def parent_deleted(sender, instance, **kwargs):
+    # Before the cascade drops the links
+    child_ids = instance.children.values_list('pk', flat=True)
+    conditional.bump(
+        [conditional.parent_scope(instance.pk), conditional.DIRECTORY_SCOPE] + conditional.child_scopes(child_ids)
+    )
+
+
+@receiver(post_save, sender=Child)
+def child_saved(sender, instance, **kwargs):
+    conditional.bump(conditional.child_scopes([instance.pk]))
+
+
+@receiver(m2m_changed, sender=Child.parents.through)
+def child_parents_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        parents = Parent.objects.filter(pk__in=pk_set) if action != 'pre_clear' else instance.parents.all()
+        parents = list(parents.values_list('pk', 'user_id'))
+        links = [(parent_id, instance.pk) for parent_id, _ in parents]
+        user_ids = [instance.user_id] + [user_id for _, user_id in parents]
+    else:
+        children = Child.objects.filter(pk__in=pk_set) if action != 'pre_clear' else instance.children.all()
+        children = list(children.values_list('pk', 'user_id'))
+        links = [(instance.pk, child_id) for child_id, _ in children]
+        user_ids = [instance.user_id] + [user_id for _, user_id in children]
+    # Both sides' tokens and access contexts embed the link (api/authentication.py)
+    authentication.bump_access_versions(user_ids)
+    # Removed links are gone after post_remove, so name their parents explicitly
+    conditional.bump(
+        [conditional.parent_scope(parent_id) for parent_id, _ in links]
+        + conditional.child_scopes(child_id for _, child_id in links),
+        using=using,
+    )
+    if action == 'post_add':
+        transaction.on_commit(lambda: leaderboards.add_members(links), using=using)
+    else:
+        transaction.on_commit(lambda: leaderboards.remove_members(links), using=using)
+
+
+@receiver(pre_delete, sender=Child)
+def child_deleted(sender, instance, **kwargs):
+    # The cascade removes the parents links without sending m2m_changed
+    parents = list(instance.parents.values_list('pk', 'user_id'))
+    authentication.bump_access_versions([user_id for _, user_id in parents])
+    conditional.bump(conditional.child_scopes([instance.pk]))
+    links = [(parent_id, instance.pk) for parent_id, _ in parents]
+    transaction.on_commit(lambda: leaderboards.remove_members(links))
+
+
+@receiver(ledger_changed, sender=ScoreTransaction)
+def update_rollups(sender, added, removed, using=None, **kwargs):
+    rollups.apply_rollup_deltas(added=added, removed=removed, using=using)
+
+
+@receiver(ledger_changed, sender=ScoreTransaction)
+def update_leaderboards(sender, added, removed, using=None, **kwargs):
+    deltas = ledger.ledger_deltas(added=added, removed=removed)
+    if deltas:
+        transaction.on_commit(lambda: leaderboards.apply_deltas(deltas), using=using)
+
+
+@receiver(ledger_changed, sender=ScoreTransaction)
+def bump_ledger_versions(sender, added, removed, using=None, **kwargs):
+    # Also covers reward approvals, whose RewardRequest UPDATE always comes with a debit
+    child_ids = {txn.child_id for txn in added} | {txn.child_id for txn in removed}
+    conditional.bump(conditional.child_scopes(child_ids), using=using)
+
+
+@receiver(ledger_changed, sender=ScoreTransaction)
+def publish_ledger_events(sender, added, removed, **kwargs):
+    updated_ids = {txn.pk for txn in removed}
+    events.publish_transactions_created([txn for txn in added if txn.pk not in updated_ids])
+
+
+@receiver(post_save, sender=RewardRequest)
+def reward_request_created(sender, instance, created, **kwargs):
+    if created:
+        events.publish_reward_request(instance, 'reward_request.created')
+
+
+@receiver([post_save, post_delete], sender=RewardRequest)
+def reward_request_changed(sender, instance, origin=None, **kwargs):
+    # Cascades from a reward or child: their pre_delete receivers bump these scopes once
+    if isinstance(origin, (Reward, Child)):
+        return
+    conditional.bump(conditional.child_scopes([instance.child_id]))
@@ -1,5 +1,21 @@
+from datetime import timedelta
+
 from celery import shared_task
-from django.core.mail import send_mail
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.utils import timezone
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 
 @shared_task
 def send_reminder_email(child_user_id, task_description):
@@ -13,3 +29,181 @@ def send_reminder_email(child_user_id, task_description):
         [user.email],
         fail_silently=False,
     )
+
+
+@shared_task
+def fan_out_reminders(task_description=None):
+    """
+    Queue reminder emails for every child with an email address, one
+    send_reminder_batch task per REMINDER_BATCH_SIZE children.
+    """
+    from .models import Child
+
+    task_description = task_description or settings.REMINDER_DEFAULT_TASK
+    user_ids = (
+        Child.objects.exclude(user__email='').order_by('pk')
+        .values_list('user_id', flat=True).iterator(chunk_size=settings.REMINDER_BATCH_SIZE)
+    )
+    batches = 0
+    for chunk in _chunks(user_ids, settings.REMINDER_BATCH_SIZE):
+        send_reminder_batch.delay(chunk, task_description)
+        batches += 1
+    return batches
+
+
+@shared_task
+def send_reminder_batch(child_user_ids, task_description):
+    """Send one chunk of reminders over a single SMTP connection."""
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+
+    recipients = User.objects.filter(pk__in=child_user_ids).exclude(email='').values_list('username', 'email')
+    messages = [
+        EmailMessage(
+            'Reminder: Task Pending',
+            f'Hi {username}, remember to complete: {task_description}',
+            settings.REMINDER_FROM_EMAIL,
+            [email],
+        )
+        for username, email in recipients
+    ]
+    with get_connection(fail_silently=False) as connection:
+        return connection.send_messages(messages)
+
+
+@shared_task
+def fan_out_parent_digests(day=None):
+    """Queue one send_parent_digest_batch per REMINDER_BATCH_SIZE parents."""
+    from .models import Parent
+
+    parent_ids = (
+        Parent.objects.exclude(user__email='').order_by('pk')
+        .values_list('pk', flat=True).iterator(chunk_size=settings.REMINDER_BATCH_SIZE)
+    )
+    batches = 0
+    for chunk in _chunks(parent_ids, settings.REMINDER_BATCH_SIZE):
+        send_parent_digest_batch.delay(chunk, day)
+        batches += 1
+    return batches
+
+
+@shared_task
+def send_parent_digest_batch(parent_ids, day=None):
+    """
+    One email per parent merging their children's pending reward requests
+    and the day's point changes (from the daily rollups). Parents with
+    nothing to report are skipped. Four queries and one SMTP connection
+    per chunk.
+    """
+    from collections import defaultdict
+
+    from django.utils.dateparse import parse_date
+
+    from .models import Child, DailyPointsRollup, Parent, RewardRequest
+
+    day = parse_date(day) if day else timezone.localdate()
+    parents = Parent.objects.filter(pk__in=parent_ids).exclude(user__email='').select_related('user')
+    children_by_parent = defaultdict(list)
+    child_names = {}
+    links = Child.parents.through.objects.filter(parent_id__in=parent_ids).values_list(
+        'parent_id', 'child_id', 'child__user__username'
+    )
+    for parent_id, child_id, username in links:
+        children_by_parent[parent_id].append(child_id)
+        child_names[child_id] = username
+
+    pending = defaultdict(list)
+    requests = RewardRequest.objects.filter(child_id__in=child_names, approved=False).values_list(
+        'child_id', 'reward__name', 'reward__cost'
+    ).order_by('requested_at')
+    for child_id, reward_name, cost in requests:
+        pending[child_id].append(f'{reward_name} ({cost} pts)')
+
+    changes = defaultdict(int)
+    for child_id, points in DailyPointsRollup.objects.filter(child_id__in=child_names, day=day).values_list('child_id', 'points'):
+        changes[child_id] += points
+
+    messages = []
+    for parent in parents:
+        lines = []
+        for child_id in children_by_parent.get(parent.pk, ()):
+            name = child_names[child_id]
+            if child_id in changes:
+                lines.append(f'{name}: {changes[child_id]:+d} points today')
+            for reward in pending.get(child_id, ()):
+                lines.append(f'{name} is waiting for approval: {reward}')
+        if not lines:
+            continue
+        messages.append(EmailMessage(
+            f'Your daily summary for {day:%Y-%m-%d}',
+            f'Hi {parent.user.username},\n\n' + '\n'.join(lines),
+            settings.REMINDER_FROM_EMAIL,
+            [parent.user.email],
+        ))
+    if not messages:
+        return 0
+    with get_connection(fail_silently=False) as connection:
+        return connection.send_messages(messages)
+
+
+@shared_task
+def compact_ledger(retention_days=None):
+    """
+    Archive ScoreTransactions older than the retention period, leaving a
+    LedgerCheckpoint per child so balances and history stay intact.
+    """
+    from .ledger import compact_child_ledger
+    from .models import ScoreTransaction
+
+    days = retention_days or settings.LEDGER_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    child_ids = list(
+        ScoreTransaction.objects.filter(created_at__lt=cutoff)
+        .order_by().values_list('child_id', flat=True).distinct()
+    )
+    return sum(compact_child_ledger(child_id, cutoff) for child_id in child_ids)
+
+
+@shared_task
+def rebuild_daily_rollups(child_ids=None, since=None):
+    """Backfill/repair DailyPointsRollup; `since` is an ISO date, both optional."""
+    from django.utils.dateparse import parse_date
+
+    from .rollups import rebuild_rollups
+
+    return rebuild_rollups(child_ids=child_ids, since=parse_date(since) if since else None)
+
+
+@shared_task
+def run_import_job(job_id):
+    """Run (or resume) an ImportJob; see api/imports.py."""
+    from .imports import run_import
+    from .models import ImportJob
+
+    job = ImportJob.objects.get(pk=job_id)
+    if job.status == 'completed':
+        return job.processed_rows
+    ImportJob.objects.filter(pk=job_id).update(status='running', last_error='')
+    try:
+        run_import(job)
+    except Exception as exc:
+        ImportJob.objects.filter(pk=job_id).update(status='failed', last_error=repr(exc))
+        raise
+    ImportJob.objects.filter(pk=job_id).update(status='completed', finished_at=timezone.now())
+    return ImportJob.objects.values_list('processed_rows', flat=True).get(pk=job_id)
+
+
+@shared_task
+def flush_score_ingest(max_batches=50):
+    """Drain buffered awards into the ledger (see api/ingest.py)."""
+    from .ingest import flush, get_buffer
+
+    inserted = 0
+    for _ in range(max_batches):
+        count = flush()
+        if count is None:  # another flusher holds the lock
+            break
+        inserted += count
+        if not len(get_buffer()):
+            break
+    return inserted
@@ -0,0 +1,310 @@
+"""
+Query-count regression tests.
+
+Every endpoint in api/urls.py must answer in a fixed number of queries,
+however many children and co-parents the family behind the request has.
+Each check runs against a small and a large family, with a cold cache, and
+includes the work deferred to on_commit.
+"""
+import itertools
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import leaderboards
+from .authentication import ClaimsTokenObtainPairSerializer
+from .models import Child, Parent, Reward, RewardRequest, ScoreTransaction, User
+
+# (children, parents): one parent, and co-parents sharing every child
+FAMILY_SIZES = [(2, 1), (6, 3)]
+PASSWORD = 'correct horse'
+
+
+class Family:
+    def __init__(self, parents, children, transactions, rewards, requests):
+        self.parents = parents
+        self.children = children
+        self.transactions = transactions
+        self.rewards = rewards
+        self.requests = requests
+
+    @property
+    def parent(self):
+        return self.parents[0]
+
+    @property
+    def child(self):
+        return self.children[0]
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryCountTests(TestCase):
+    _names = itertools.count()
+
+    def setUp(self):
+        # In-process boards outlive each test's rolled-back rows, whose ids get reused
+        leaderboards._backend = None
+
+    def make_family(self, children, parents):
+        def user(role):
+            return User.objects.create_user(f'{role}-{next(self._names)}', password=PASSWORD, role=role)
+
+        parent_objs = [Parent.objects.create(user=user('parent')) for _ in range(parents)]
+        child_objs = [Child.objects.create(user=user('child')) for _ in range(children)]
+        for child in child_objs:
+            child.parents.set(parent_objs)
+        transactions = ScoreTransaction.objects.bulk_create([
+            ScoreTransaction(child=child, parent=parent_objs[0], points=50, transaction_type='add')
+            for child in child_objs
+            for _ in range(3)
+        ])
+        rewards = [Reward.objects.create(parent=parent, name='Movie night', cost=10) for parent in parent_objs]
+        requests = [RewardRequest.objects.create(child=child, reward=rewards[0]) for child in child_objs]
+        return Family(parent_objs, child_objs, transactions, rewards, requests)
+
+    def client_for(self, profile):
+        client = APIClient()
+        # Reloaded: linking the family bumped the user's access_version
+        user = User.objects.get(pk=profile.user_id)
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def assertFixedQueries(self, num, call, status=200, as_child=False):
+        """
+        `call(client, family)` takes `num` queries for every family size, as the
+        family's first parent (or first child). The cache is cleared first, so
+        the count includes refilling it.
+        """
+        for children, parents in FAMILY_SIZES:
+            with self.subTest(children=children, parents=parents):
+                family = self.make_family(children, parents)
+                client = self.client_for(family.child if as_child else family.parent)
+                cache.clear()
+                with self.assertNumQueries(num), self.captureOnCommitCallbacks(execute=True):
+                    response = call(client, family)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertEqual(response.status_code, status)
+
+    # Auth/Users
+
+    def test_token(self):
+        def call(client, family):
+            return APIClient().post('/api/token/', {'username': family.parent.user.username, 'password': PASSWORD})
+
+        self.assertFixedQueries(3, call)
+
+    def test_token_refresh(self):
+        def call(client, family):
+            refresh = RefreshToken.for_user(family.parent.user)
+            return APIClient().post('/api/token/refresh/', {'refresh': str(refresh)})
+
+        self.assertFixedQueries(4, call)
+
+    def test_register(self):
+        def call(client, family):
+            data = {'username': f'new-{next(self._names)}', 'password': PASSWORD, 'role': 'child'}
+            return APIClient().post('/api/register/', data)
+
+        self.assertFixedQueries(5, call, status=201)
+
+    def test_current_user(self):
+        self.assertFixedQueries(1, lambda client, f: client.get('/api/user/'))
+
+    def test_dashboard(self):
+        self.assertFixedQueries(6, lambda client, f: client.get('/dashboard/'))
+
+    def test_dashboard_as_child(self):
+        self.assertFixedQueries(7, lambda client, f: client.get('/dashboard/'), as_child=True)
+
+    @override_settings(EVENTS_STREAM_MAX_SECONDS=0)
+    def test_events(self):
+        self.assertFixedQueries(1, lambda client, f: client.get('/events/'))
+
+    def test_points_analytics(self):
+        self.assertFixedQueries(2, lambda client, f: client.get('/analytics/points/'))
+
+    def test_points_analytics_weekly_as_child(self):
+        self.assertFixedQueries(3, lambda client, f: client.get('/analytics/points/?bucket=week'), as_child=True)
+
+    def test_leaderboards(self):
+        self.assertFixedQueries(3, lambda client, f: client.get(f'/leaderboards/?child={f.children[-1].pk}'))
+
+    def test_leaderboards_as_child(self):
+        self.assertFixedQueries(4, lambda client, f: client.get('/leaderboards/'), as_child=True)
+
+    # Parents
+
+    def test_parents_list(self):
+        self.assertFixedQueries(2, lambda client, f: client.get('/parents/'))
+
+    def test_parents_retrieve(self):
+        self.assertFixedQueries(2, lambda client, f: client.get(f'/parents/{f.parents[-1].pk}/'))
+
+    # Children
+
+    def test_children_list(self):
+        self.assertFixedQueries(3, lambda client, f: client.get('/children/'))
+
+    def test_children_list_as_child(self):
+        self.assertFixedQueries(4, lambda client, f: client.get('/children/'), as_child=True)
+
+    def test_children_retrieve(self):
+        self.assertFixedQueries(3, lambda client, f: client.get(f'/children/{f.children[-1].pk}/'))
+
+    def test_children_create_as_child(self):
+        # Children are created through api/register/; only parents get past the role check
+        self.assertFixedQueries(1, lambda client, f: client.post('/children/', {}), status=403, as_child=True)
+
+    def test_children_update(self):
+        self.assertFixedQueries(6, lambda client, f: client.put(f'/children/{f.children[-1].pk}/', {}))
+
+    def test_children_partial_update(self):
+        self.assertFixedQueries(6, lambda client, f: client.patch(f'/children/{f.children[-1].pk}/', {}))
+
+    def test_children_destroy(self):
+        self.assertFixedQueries(14, lambda client, f: client.delete(f'/children/{f.children[-1].pk}/'), status=204)
+
+    # Score transactions
+
+    def test_score_transactions_list(self):
+        self.assertFixedQueries(4, lambda client, f: client.get('/score-transactions/'))
+
+    def test_score_transactions_list_as_child(self):
+        self.assertFixedQueries(4, lambda client, f: client.get('/score-transactions/'), as_child=True)
+
+    def test_score_transactions_retrieve(self):
+        self.assertFixedQueries(2, lambda client, f: client.get(f'/score-transactions/{f.transactions[-1].pk}/'))
+
+    def test_score_transactions_create(self):
+        def call(client, family):
+            data = {'child': family.children[-1].pk, 'points': 5, 'transaction_type': 'add'}
+            return client.post('/score-transactions/', data)
+
+        self.assertFixedQueries(11, call, status=201)
+
+    def test_score_transactions_update(self):
+        def call(client, family):
+            data = {'child': family.children[-1].pk, 'points': 7, 'transaction_type': 'subtract'}
+            return client.put(f'/score-transactions/{family.transactions[-1].pk}/', data)
+
+        self.assertFixedQueries(11, call)
+
+    def test_score_transactions_partial_update(self):
+        self.assertFixedQueries(
+            10, lambda client, f: client.patch(f'/score-transactions/{f.transactions[-1].pk}/', {'points': 7})
+        )
+
+    def test_score_transactions_destroy(self):
+        self.assertFixedQueries(
+            10, lambda client, f: client.delete(f'/score-transactions/{f.transactions[-1].pk}/'), status=204
+        )
+
+    def test_score_transactions_export(self):
+        self.assertFixedQueries(3, lambda client, f: client.get('/score-transactions/export/'))
+
+    def test_score_transactions_export_ndjson(self):
+        self.assertFixedQueries(3, lambda client, f: client.get('/score-transactions/export/?format=ndjson&gzip=1'))
+
+    def test_score_transactions_bulk(self):
+        def call(client, family):
+            items = [{'child': child.pk, 'points': 5, 'transaction_type': 'add'} for child in family.children]
+            return client.post('/score-transactions/bulk/', items, format='json')
+
+        self.assertFixedQueries(8, call, status=201)
+
+    def test_score_transactions_ingest(self):
+        def call(client, family):
+            items = [{'child': child.pk, 'points': 5, 'transaction_type': 'add'} for child in family.children]
+            return client.post('/score-transactions/ingest/', items, format='json')
+
+        self.assertFixedQueries(1, call, status=202)
+
+    # Rewards
+
+    def test_rewards_list(self):
+        self.assertFixedQueries(2, lambda client, f: client.get('/rewards/'))
+
+    def test_rewards_list_as_child(self):
+        self.assertFixedQueries(3, lambda client, f: client.get('/rewards/'), as_child=True)
+
+    def test_rewards_retrieve(self):
+        self.assertFixedQueries(2, lambda client, f: client.get(f'/rewards/{f.rewards[0].pk}/'))
+
+    def test_rewards_create(self):
+        self.assertFixedQueries(4, lambda client, f: client.post('/rewards/', {'name': 'Zoo', 'cost': 30}), status=201)
+
+    def test_rewards_update(self):
+        self.assertFixedQueries(
+            3, lambda client, f: client.put(f'/rewards/{f.rewards[0].pk}/', {'name': 'Zoo', 'cost': 30})
+        )
+
+    def test_rewards_partial_update(self):
+        self.assertFixedQueries(3, lambda client, f: client.patch(f'/rewards/{f.rewards[0].pk}/', {'cost': 30}))
+
+    def test_rewards_destroy(self):
+        self.assertFixedQueries(7, lambda client, f: client.delete(f'/rewards/{f.rewards[0].pk}/'), status=204)
+
+    def test_rewards_redeem(self):
+        self.assertFixedQueries(
+            12, lambda client, f: client.post(f'/rewards/{f.rewards[-1].pk}/redeem/'), as_child=True
+        )
+
+    # Reward requests
+
+    def test_reward_requests_list(self):
+        self.assertFixedQueries(2, lambda client, f: client.get('/reward-requests/'))
+
+    def test_reward_requests_retrieve(self):
+        self.assertFixedQueries(
+            2, lambda client, f: client.get(f'/reward-requests/{f.requests[-1].pk}/')
+        )
+
+    def test_reward_requests_create(self):
+        def call(client, family):
+            data = {'child': family.child.pk, 'reward': family.rewards[-1].pk}
+            return client.post('/reward-requests/', data)
+
+        self.assertFixedQueries(7, call, status=201, as_child=True)
+
+    def test_reward_requests_update(self):
+        def call(client, family):
+            reward_request = family.requests[-1]
+            data = {'child': reward_request.child_id, 'reward': family.rewards[-1].pk}
+            return client.put(f'/reward-requests/{reward_request.pk}/', data)
+
+        self.assertFixedQueries(7, call)
+
+    def test_reward_requests_partial_update(self):
+        self.assertFixedQueries(
+            5, lambda client, f: client.patch(f'/reward-requests/{f.requests[-1].pk}/', {'reward': f.rewards[-1].pk})
+        )
+
+    def test_reward_requests_destroy(self):
+        self.assertFixedQueries(
+            4, lambda client, f: client.delete(f'/reward-requests/{f.requests[-1].pk}/'), status=204
+        )
+
+    def test_reward_requests_approve(self):
+        self.assertFixedQueries(
+            12, lambda client, f: client.post(f'/reward-requests/{f.requests[-1].pk}/approve/')
+        )
+
+    def test_reward_requests_approve_batch(self):
+        def call(client, family):
+            ids = [reward_request.pk for reward_request in family.requests]
+            return client.post('/reward-requests/approve-batch/', {'ids': ids}, format='json')
+
+        self.assertFixedQueries(13, call)
+
+    # Metrics
+
+    @override_settings(METRICS_TOKEN='scrape')
+    def test_metrics(self):
+        self.assertFixedQueries(0, lambda client, f: APIClient().get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape'))
+
+    def test_metrics_without_token(self):
+        self.assertFixedQueries(0, lambda client, f: APIClient().get('/metrics/'), status=403)
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import *
+from .profiling import metrics_view
 
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -12,18 +13,17 @@ router.register(r'parents', ParentViewSet, basename='parent')
 router.register(r'children', ChildViewSet, basename='child')
 router.register(r'score-transactions', ScoreTransactionViewSet, basename='scoretransaction')
 router.register(r'rewards', RewardViewSet, basename='reward')
+router.register(r'reward-requests', RewardRequestViewSet, basename='rewardrequest')
 
 urlpatterns = [
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),  # Login
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('', include(router.urls)),
     path('api/register/', RegisterView.as_view(), name='register'),
-    path('api/score-transactions/', ScoreTransactionCreateView.as_view(), name='score-transaction-create'),
-    path('api/rewards/', RewardListView.as_view(), name='reward-list'),
-    path('api/rewards/redeem/', RedeemRewardView.as_view(), name='reward-redeem'),
     path('api/user/', CurrentUserView.as_view(), name='current-user'),
-    path('api/score-transactions/', ScoreTransactionCreateView.as_view(), name='score-transaction-create'),
-    path('api/reward-requests/', RewardRequestListView.as_view(), name='reward-request-list'),
-    path('api/reward-requests/<int:pk>/approve/', RewardRequestApproveView.as_view(), name='reward-request-approve'),
-    path('api/reward-requests/create/', RewardRequestCreateView.as_view(), name='reward-request-create'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('events/', EventStreamView.as_view(), name='event-stream'),
+    path('analytics/points/', PointsAnalyticsView.as_view(), name='points-analytics'),
+    path('leaderboards/', LeaderboardView.as_view(), name='leaderboards'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -1,29 +1,127 @@
 # backend/api/views.py
 
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
-
-from .models import Parent, Child, ScoreTransaction, Reward, RewardRequest
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+from . import events, exports, ingest, leaderboards, projections
+from .access import get_access
+from .authentication import QueryParamJWTAuthentication
+from .cache import reward_catalog
+from .conditional import DIRECTORY_SCOPE, ConditionalGetMixin
+from .ledger import AlreadyApproved, InsufficientPoints, approve_reward_request, approve_reward_requests, redeem
+from .models import Parent, Child, ScoreTransaction, ArchivedScoreTransaction, Reward, RewardRequest
 from .serializers import (
     ParentSerializer,
     ChildSerializer,
     ScoreTransactionSerializer,
+    ScoreTransactionBulkItemSerializer,
+    ScoreTransactionIngestItemSerializer,
     RewardSerializer,
     RewardRequestSerializer,
     UserSerializer,
 )
+from .pagination import KeysetPagination
+from .rollups import BUCKETS, points_series
 from .permissions import IsParent, IsChild, IsOwnerOrParent
+from .routing import ReplicaReadMixin
 
 User = get_user_model()
 
 
+def _parse_time_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is not None:
+            parsed = datetime.combine(day, time.min)
+    if parsed is None:
+        raise ValidationError({name: 'Expected an ISO 8601 date or datetime.'})
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parents_prefetch():
+    """A child's parents with their users, in one query for any number of children."""
+    return Prefetch('parents', queryset=Parent.objects.select_related('user').order_by('pk'))
+
+
+# Scoping takes the request's AccessContext (api/access.py): the visible child
+# ids are resolved once per request, usually straight from the token's claims.
+
+def visible_children(access):
+    if access.is_parent or access.is_child:
+        queryset = Child.objects.filter(pk__in=access.child_ids)
+    else:
+        return Child.objects.none()
+    # Fixed query count regardless of family size: one for the children
+    # (balance is a stored column), one for all their parents + users.
+    return queryset.select_related('user').prefetch_related(parents_prefetch()).order_by('pk')
+
+
+def visible_ledger(access, model=ScoreTransaction):
+    """Live (or, with model=ArchivedScoreTransaction, compacted) ledger rows the caller may see."""
+    if access.is_parent or access.is_child:
+        # Parents see all transactions for their children (not just those created by them),
+        # so redemptions (which have parent=None) are visible.
+        queryset = model.objects.filter(child_id__in=access.child_ids)
+    else:
+        return model.objects.none()
+    return queryset.select_related('parent__user').order_by('-created_at', '-id')
+
+
+def visible_reward_requests(access):
+    if access.is_parent or access.is_child:
+        queryset = RewardRequest.objects.filter(child_id__in=access.child_ids)
+    else:
+        return RewardRequest.objects.none()
+    return queryset.select_related('reward', 'child__user').order_by('-requested_at')
+
+
+def filter_time_range(queryset, request, field):
+    """Apply ?since= (inclusive) and ?until= (exclusive) to `field`."""
+    since = _parse_time_param(request, 'since')
+    until = _parse_time_param(request, 'until')
+    if since is not None:
+        queryset = queryset.filter(**{f'{field}__gte': since})
+    if until is not None:
+        queryset = queryset.filter(**{f'{field}__lt': until})
+    return queryset
+
+
+def validated_children(serializer, items):
+    """
+    The validated `child` of each item of a many=True serializer that has
+    run is_valid(), or None for the items that failed validation.
+    """
+    if not serializer.errors:
+        return [item['child'] for item in serializer.validated_data]
+    # An invalid batch has no validated_data; convert the error-free items' ids alone
+    field = serializer.child.fields['child']
+    return [
+        None if errors else field.run_validation(item['child'])
+        for item, errors in zip(items, serializer.errors)
+    ]
+
+
 # ---------------------------
 # Auth/Users
 # ---------------------------
@@ -52,7 +150,7 @@ class RegisterView(APIView):
         return Response({'detail': 'User registered successfully'}, status=status.HTTP_201_CREATED)
 
 
-class CurrentUserView(APIView):
+class CurrentUserView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -60,89 +158,461 @@ class CurrentUserView(APIView):
         return Response({'username': user.username, 'role': user.role})
 
 
+class DashboardView(ConditionalGetMixin, APIView):
+    """
+    Everything a dashboard renders, in one round-trip:
+      - children: the parent's children, or the child themself, with balances
+      - pending_requests: reward requests awaiting approval
+      - rewards: the reward catalog visible to the user
+      - recent_transactions: the ?recent= (default 10, max 50) newest ledger rows
+    """
+    permission_classes = [IsAuthenticated]
+    default_recent = 10
+    max_recent = 50
+
+    def get(self, request):
+        user = request.user
+        try:
+            recent = int(request.query_params.get('recent', self.default_recent))
+        except ValueError:
+            raise ValidationError({'recent': 'Expected an integer.'})
+        recent = max(0, min(recent, self.max_recent))
+
+        access = get_access(request)
+        children = visible_children(access)
+        pending = visible_reward_requests(access).filter(approved=False)
+        transactions = visible_ledger(access)[:recent]
+
+        return Response({
+            'role': user.role,
+            'children': ChildSerializer(children, many=True).data,
+            'pending_requests': RewardRequestSerializer(pending, many=True).data,
+            'rewards': reward_catalog(access.parent_ids),
+            'recent_transactions': ScoreTransactionSerializer(transactions, many=True).data,
+        })
+
+
+class PointsAnalyticsView(ConditionalGetMixin, APIView):
+    """
+    Points earned/subtracted/redeemed per child over time, from the daily rollups:
+      - ?start=&end=: inclusive ISO dates, default the last 30 days
+      - ?bucket=day|week (weeks start on Monday)
+      - ?child=<id>: one child instead of all visible children
+    """
+    permission_classes = [IsAuthenticated]
+    max_periods = 400
+
+    def get(self, request):
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in BUCKETS:
+            raise ValidationError({'bucket': f'Expected one of: {", ".join(BUCKETS)}.'})
+        end = self._date_param(request, 'end') or timezone.localdate()
+        start = self._date_param(request, 'start') or end - timedelta(days=29)
+        if start > end:
+            raise ValidationError({'start': 'Must not be after end.'})
+        if (end - start).days // (7 if bucket == 'week' else 1) >= self.max_periods:
+            raise ValidationError({'start': f'At most {self.max_periods} {bucket}s per request.'})
+
+        child_ids = sorted(get_access(request).child_ids)
+        child = request.query_params.get('child')
+        if child is not None:
+            if not child.isdigit():
+                raise ValidationError({'child': 'Expected a child id.'})
+            child_ids = [child_id for child_id in child_ids if child_id == int(child)]
+        if child is not None and not child_ids:
+            return Response({'detail': 'Child not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'bucket': bucket,
+            'start': start,
+            'end': end,
+            'series': points_series(child_ids, start, end, bucket),
+        })
+
+    def conditional_key(self, request):
+        # The default range ends today
+        return timezone.localdate()
+
+    @staticmethod
+    def _date_param(request, name):
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError({name: 'Expected an ISO 8601 date.'})
+        return day
+
+
+class LeaderboardView(ConditionalGetMixin, APIView):
+    """
+    Children ranked by balance within each parent's group, from the
+    incrementally maintained boards (api/leaderboards.py):
+      - ?parent=<id>: one group; default every group the user belongs to
+      - ?top=: entries from the top (default 10, max 100)
+      - ?around=: neighbours either side of "me" (default 2, max 25)
+      - ?child=<id>: for parents, whose rank to center "me" on
+    Children always get their own rank as "me".
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        access = get_access(request)
+        top = self._int_param(request, 'top', 10, 1, 100)
+        around = self._int_param(request, 'around', 2, 0, 25)
+
+        parent_ids = sorted(access.parent_ids)
+        parent = request.query_params.get('parent')
+        if parent is not None:
+            if not parent.isdigit() or int(parent) not in access.parent_ids:
+                return Response({'detail': 'Group not found.'}, status=status.HTTP_404_NOT_FOUND)
+            parent_ids = [int(parent)]
+
+        me = access.child_id
+        child = request.query_params.get('child')
+        if child is not None and access.is_parent:
+            if not child.isdigit() or not access.can_see_child(int(child)):
+                return Response({'detail': 'Child not found.'}, status=status.HTTP_404_NOT_FOUND)
+            me = int(child)
+
+        leaderboards.ensure_built(parent_ids)
+        boards = {parent_id: leaderboards.board(parent_id, top=top, child_id=me, around=around) for parent_id in parent_ids}
+        member_ids = {
+            child_id
+            for result in boards.values()
+            for _, child_id, _ in result['top'] + (result['me']['around'] if result['me'] else [])
+        }
+        names = dict(Child.objects.filter(pk__in=member_ids).values_list('pk', 'user__username'))
+
+        def entries(rows):
+            return [
+                {'rank': rank, 'child': child_id, 'username': names.get(child_id), 'balance': balance}
+                for rank, child_id, balance in rows
+            ]
+
+        return Response({'boards': [
+            {
+                'parent': parent_id,
+                'size': result['size'],
+                'top': entries(result['top']),
+                'me': {'rank': result['me']['rank'], 'around': entries(result['me']['around'])} if result['me'] else None,
+            }
+            for parent_id, result in boards.items()
+        ]})
+
+    @staticmethod
+    def _int_param(request, name, default, low, high):
+        try:
+            value = int(request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: 'Expected an integer.'})
+        return max(low, min(value, high))
+
+
+class PassthroughRenderer(BaseRenderer):
+    """
+    Registers a streamed media type for content negotiation (Accept / ?format=).
+    The stream itself bypasses rendering; only error payloads come through here.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+class EventStreamRenderer(PassthroughRenderer):
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+
+class CSVRenderer(PassthroughRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(PassthroughRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class EventStreamView(APIView):
+    """
+    Server-Sent Events for the children the user may see:
+      - score_transaction.created
+      - reward_request.created / reward_request.approved
+    Streams are recycled every EVENTS_STREAM_MAX_SECONDS; EventSource reconnects.
+    Serve through ASGI so open streams don't each pin a worker.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [QueryParamJWTAuthentication]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request):
+        access = get_access(request)
+        channels = [events.child_channel(child_id) for child_id in sorted(access.child_ids)]
+        if isinstance(request._request, ASGIRequest):
+            content = events.astream(channels, access.user_id, access.version)
+        else:
+            content = events.stream(channels, access.user_id, access.version)
+        response = StreamingHttpResponse(content, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+        return response
+
+
 # ---------------------------
 # Parents
 # ---------------------------
 
-class ParentViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Parent.objects.all()
+class ParentViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Parent.objects.select_related('user').order_by('pk')
     serializer_class = ParentSerializer
     permission_classes = [permissions.IsAuthenticated, IsParent]
 
+    def conditional_scopes(self, request):
+        # Lists every parent, not just the caller's family
+        return super().conditional_scopes(request) + [DIRECTORY_SCOPE]
+
 
 # ---------------------------
 # Children
 # ---------------------------
 
-class ChildViewSet(viewsets.ModelViewSet):
+class ChildViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Child.objects.all()
     serializer_class = ChildSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrParent]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'parent':
-            parent = user.parent_profile
-            return parent.children.all()
-        elif user.role == 'child':
-            return Child.objects.filter(user=user)
-        return Child.objects.none()
+        return visible_children(get_access(self.request))
+
+    def list(self, request, *args, **kwargs):
+        # Fast read path: values() projection, same shape as ChildSerializer; ?fields= to trim
+        fields = projections.parse_fields(request, projections.CHILD)
+        return Response(projections.CHILD.list(self.filter_queryset(self.get_queryset()), fields))
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        # UpdateModelMixin drops the prefetched parents after saving, leaving
+        # the response to load each parent's user; reload them in one query
+        instance._prefetched_objects_cache = {}
+        prefetch_related_objects([instance], parents_prefetch())
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         # Only allow parents to create children and auto-link to themselves
-        if self.request.user.role != 'parent':
+        access = get_access(self.request)
+        if not access.is_parent:
             raise PermissionDenied('Only parents can create children.')
         child = serializer.save()
-        child.parents.add(self.request.user.parent_profile)
+        child.parents.add(access.parent_id)
 
 
 # ---------------------------
 # Score Transactions
 # ---------------------------
 
-class ScoreTransactionViewSet(viewsets.ModelViewSet):
+class ScoreTransactionViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     Parents:
       - list: all transactions for their children (including child-initiated redemptions)
       - create/update/delete: allowed (add/subtract/redeem on behalf if desired)
+      - bulk: award many children in one request
+      - ingest: buffer awards for batched write-behind (202 Accepted)
+      - export: stream the full history as CSV/NDJSON
     Children:
       - list: only their own transactions
       - create/update/delete: not allowed
+    Lists are newest first, cursor-paginated, filterable with ?since=/?until=
+    and trimmed with ?fields=.
     """
     serializer_class = ScoreTransactionSerializer
+    pagination_class = KeysetPagination
+    bulk_max_items = 500
+    projected_fields = None  # set by list(), for get_page_rows()
 
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk', 'ingest']:
             permission_classes = [permissions.IsAuthenticated, IsParent]
         else:
             permission_classes = [permissions.IsAuthenticated]
         return [perm() for perm in permission_classes]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'parent':
-            parent = user.parent_profile
-            # Show all transactions for the parent's children (not just those created by this parent),
-            # so redemptions (which have parent=None) are visible.
-            return ScoreTransaction.objects.filter(
-                child__in=parent.children.all()
-            ).order_by('-created_at')
-        elif user.role == 'child':
-            child = user.child_profile
-            return ScoreTransaction.objects.filter(child=child).order_by('-created_at')
-        return ScoreTransaction.objects.none()
+        queryset = visible_ledger(get_access(self.request))
+        return filter_time_range(queryset, self.request, 'created_at')
+
+    def get_keyset_scopes(self):
+        # One index range scan per visible child (see KeysetPagination)
+        return get_access(self.request).child_ids
+
+    def get_archive_queryset(self):
+        # Compacted history (see api.ledger.compact_child_ledger); the pagination
+        # falls through to it once the live rows are exhausted.
+        queryset = visible_ledger(get_access(self.request), model=ArchivedScoreTransaction)
+        return filter_time_range(queryset, self.request, 'created_at')
+
+    def get_page_rows(self, queryset):
+        # KeysetPagination picked the page's rows (live or archived); load them projected
+        if self.projected_fields is None:
+            return list(queryset)
+        return list(projections.SCORE_TRANSACTION.values(queryset, self.projected_fields))
+
+    def list(self, request, *args, **kwargs):
+        # Fast read path: values() projection, same shape as ScoreTransactionSerializer
+        projection = projections.SCORE_TRANSACTION
+        self.projected_fields = projections.parse_fields(request, projection)
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        return self.get_paginated_response(projection.render(page, self.projected_fields))
 
     def perform_create(self, serializer):
         # Only parents reach here due to permissions; attach the acting parent
-        parent = self.request.user.parent_profile
-        serializer.save(parent=parent)
+        serializer.save(parent_id=get_access(self.request).parent_id)
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer, JSONRenderer])
+    def export(self, request):
+        """
+        Full history, oldest first, streamed (archived rows included):
+          - ?format=csv (default) or ?format=ndjson, or the matching Accept header
+          - ?gzip=1 to download it compressed
+          - ?since=/?until= as for the list
+        """
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, (CSVRenderer, NDJSONRenderer)):
+            renderer = CSVRenderer()
+        export_format = renderer.format
+        gzip = request.query_params.get('gzip') in ('1', 'true')
+
+        content = exports.export_ledger(
+            archived=self.get_archive_queryset(),
+            live=self.get_queryset(),
+            export_format=export_format,
+            gzip=gzip,
+        )
+        if isinstance(request._request, ASGIRequest):
+            content = exports.aiter_chunks(content)
+        filename = f'score-transactions.{export_format}'
+        if gzip:
+            content_type, filename = 'application/gzip', f'{filename}.gz'
+        else:
+            content_type = f'{renderer.media_type}; charset=utf-8'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Parent awards points to many children at once:
+          - Body is a list of {child, points, transaction_type, description}
+          - All-or-nothing: any invalid item rejects the whole batch
+          - Rows are inserted with one bulk write in one transaction
+        """
+        if not isinstance(request.data, list) or not request.data:
+            return Response({'detail': 'Expected a non-empty list of transactions.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.bulk_max_items:
+            return Response(
+                {'detail': f'At most {self.bulk_max_items} transactions per request.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = ScoreTransactionBulkItemSerializer(data=request.data, many=True)
+        serializer.is_valid()
+        item_errors = list(serializer.errors) or [{} for _ in request.data]
+
+        # Ownership of every child in the batch, without a query per item
+        access = get_access(request)
+        owned_ids = access.child_ids
+        for index, child_id in enumerate(validated_children(serializer, request.data)):
+            if child_id is not None and child_id not in owned_ids:
+                item_errors[index] = {'child': ['Not authorized for this child.']}
+
+        if any(item_errors):
+            results = [
+                {'index': index, 'status': 'error', 'errors': errors} if errors else {'index': index, 'status': 'ok'}
+                for index, errors in enumerate(item_errors)
+            ]
+            return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        transactions = [
+            ScoreTransaction(
+                child_id=item['child'],
+                parent_id=access.parent_id,
+                points=item['points'],
+                transaction_type=item['transaction_type'],
+                description=item['description'],
+            )
+            for item in serializer.validated_data
+        ]
+        # One INSERT in one transaction; bulk_create also normalizes signs and
+        # updates the stored balances (see ScoreTransactionQuerySet).
+        ScoreTransaction.objects.bulk_create(transactions)
+
+        results = [
+            {
+                'index': index,
+                'status': 'created',
+                'id': txn.pk,
+                'child': txn.child_id,
+                'points': txn.points,
+                'transaction_type': txn.transaction_type,
+            }
+            for index, txn in enumerate(transactions)
+        ]
+        return Response({'results': results}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def ingest(self, request):
+        """
+        Write-behind awards for high-frequency integrations:
+          - Body is one {child, points, transaction_type, description, idempotency_key}
+            or a list of them; a single award may take its key from an Idempotency-Key header
+          - Validated and buffered, then answered with 202 and the awards' keys
+          - A background flush writes them to the ledger within seconds; retries
+            with the same key are counted once
+        """
+        many = isinstance(request.data, list)
+        items = request.data if many else [request.data]
+        if not items:
+            return Response({'detail': 'Expected an award or a non-empty list of awards.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.bulk_max_items:
+            return Response(
+                {'detail': f'At most {self.bulk_max_items} awards per request.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not many and request.headers.get('Idempotency-Key') and isinstance(items[0], dict):
+            items = [{**items[0], 'idempotency_key': request.headers['Idempotency-Key']}]
+
+        serializer = ScoreTransactionIngestItemSerializer(data=items, many=True)
+        serializer.is_valid()
+        item_errors = list(serializer.errors) or [{} for _ in items]
+        access = get_access(request)
+        for index, child_id in enumerate(validated_children(serializer, items)):
+            if child_id is not None and not access.can_see_child(child_id):
+                item_errors[index] = {'child': ['Not authorized for this child.']}
+        if any(item_errors):
+            results = [
+                {'index': index, 'status': 'error', 'errors': errors} if errors else {'index': index, 'status': 'ok'}
+                for index, errors in enumerate(item_errors)
+            ]
+            return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        keys = ingest.enqueue(serializer.validated_data, parent_id=access.parent_id)
+        return Response({'accepted': len(keys), 'idempotency_keys': keys}, status=status.HTTP_202_ACCEPTED)
 
 
 # ---------------------------
 # Rewards
 # ---------------------------
 
-class RewardViewSet(viewsets.ModelViewSet):
+class RewardViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = RewardSerializer
 
     def get_permissions(self):
@@ -153,16 +623,21 @@ class RewardViewSet(viewsets.ModelViewSet):
         return [perm() for perm in permission_classes]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'parent':
-            parent = user.parent_profile
-            return Reward.objects.filter(parent=parent)
-        elif user.role == 'child':
-            # Rewards offered by any of the child's parents
-            child = user.child_profile
-            parents = child.parents.all()
-            return Reward.objects.filter(parent__in=parents)
-        return Reward.objects.none()
+        access = get_access(self.request)
+        if access.is_parent or access.is_child:
+            # A parent's own rewards, or those offered by any of the child's parents
+            queryset = Reward.objects.filter(parent_id__in=access.parent_ids)
+        else:
+            return Reward.objects.none()
+        return queryset.select_related('parent__user').order_by('pk')
+
+    def list(self, request, *args, **kwargs):
+        # Catalogs rarely change; serve the serialized payloads from the cache.
+        fields = projections.parse_fields(request, projections.REWARD)
+        catalog = reward_catalog(get_access(request).parent_ids)
+        if len(fields) < len(projections.REWARD.fields):
+            catalog = [{name: item[name] for name in fields} for item in catalog]
+        return Response(catalog)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def redeem(self, request, pk=None):
@@ -172,23 +647,17 @@ class RewardViewSet(viewsets.ModelViewSet):
           - Parent is left as None (or could attach a parent if you want a specific one)
         """
         reward = self.get_object()
-        user = request.user
+        access = get_access(request)
 
-        if user.role != 'child':
+        if not access.is_child:
             return Response({'detail': 'Only children can redeem rewards.'}, status=status.HTTP_403_FORBIDDEN)
 
-        child = user.child_profile
-        if child.score_balance < reward.cost:
+        try:
+            # redemption without a specific parent actor
+            redeem(access.child_id, reward.cost, description=f'Redeemed reward: {reward.name}')
+        except InsufficientPoints:
             return Response({'detail': 'Not enough points to redeem this reward.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        ScoreTransaction.objects.create(
-            child=child,
-            parent=None,  # redemption without a specific parent actor
-            points=-reward.cost,
-            transaction_type='redeem',
-            description=f'Redeemed reward: {reward.name}',
-        )
-
         return Response({'detail': f'Reward {reward.name} redeemed successfully!'}, status=status.HTTP_200_OK)
 
 
@@ -196,7 +665,7 @@ class RewardViewSet(viewsets.ModelViewSet):
 # Reward Requests (Child -> Parent approval)
 # ---------------------------
 
-class RewardRequestViewSet(viewsets.ModelViewSet):
+class RewardRequestViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     Children:
       - create: request a reward
@@ -204,35 +673,31 @@ class RewardRequestViewSet(viewsets.ModelViewSet):
     Parents:
       - list: see pending requests for their children (approved=False)
       - approve: custom action to approve and deduct points
+      - approve-batch: approve many requests in one call
     """
     serializer_class = RewardRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    approve_batch_max_items = 100
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'parent':
-            parent = user.parent_profile
-            # Pending requests for this parent's children
-            return RewardRequest.objects.filter(
-                child__in=parent.children.all()
-            ).order_by('-requested_at')
-        elif user.role == 'child':
-            child = user.child_profile
-            return RewardRequest.objects.filter(child=child).order_by('-requested_at')
-        return RewardRequest.objects.none()
+        queryset = visible_reward_requests(get_access(self.request))
+        return filter_time_range(queryset, self.request, 'requested_at')
+
+    def list(self, request, *args, **kwargs):
+        # Fast read path: values() projection, same shape as RewardRequestSerializer
+        fields = projections.parse_fields(request, projections.REWARD_REQUEST)
+        return Response(projections.REWARD_REQUEST.list(self.filter_queryset(self.get_queryset()), fields))
 
     def perform_create(self, serializer):
-        user = self.request.user
-        if user.role != 'child':
+        access = get_access(self.request)
+        if not access.is_child:
             raise PermissionDenied('Only children can create reward requests.')
-        child = user.child_profile
-
         reward = serializer.validated_data.get('reward')
         # Ensure the requested reward is from one of the child's parents
-        if reward.parent not in child.parents.all():
+        if reward.parent_id not in access.parent_ids:
             raise PermissionDenied('You can only request rewards from your own parent(s).')
 
-        serializer.save(child=child, approved=False)
+        serializer.save(child_id=access.child_id, approved=False)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsParent])
     def approve(self, request, pk=None):
@@ -249,30 +714,39 @@ class RewardRequestViewSet(viewsets.ModelViewSet):
         if req.approved:
             return Response({'detail': 'Request already approved.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        parent_user = request.user
-        parent = parent_user.parent_profile
-
         # Security: ensure this child belongs to this parent
-        if parent not in req.child.parents.all():
+        access = get_access(request)
+        if not access.can_see_child(req.child_id):
             return Response({'detail': 'Not authorized for this child.'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Check balance and redeem
-        if req.child.score_balance < req.reward.cost:
+        # Check balance, redeem and mark approved in one transaction; attach acting parent
+        try:
+            approve_reward_request(req, access.user_id, parent_id=access.parent_id)
+        except AlreadyApproved:
+            return Response({'detail': 'Request already approved.'}, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientPoints:
             return Response({'detail': 'Child does not have enough points.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create redemption transaction; attach acting parent
-        ScoreTransaction.objects.create(
-            child=req.child,
-            parent=parent,
-            points=-req.reward.cost,
-            transaction_type='redeem',
-            description=f"Approved reward: {req.reward.name}",
-        )
-
-        # Mark request approved
-        req.approved = True
-        req.approved_at = timezone.now()
-        req.approved_by = parent_user
-        req.save(update_fields=['approved', 'approved_at', 'approved_by'])
-
         return Response({'detail': 'Reward request approved and points deducted.'}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='approve-batch',
+            permission_classes=[permissions.IsAuthenticated, IsParent])
+    def approve_batch(self, request):
+        """
+        Parent approves several pending requests at once:
+          - Body: {"ids": [...]}, applied in the given order per child
+          - Requests that can't be approved are reported, the rest still go through
+        """
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            return Response({'detail': 'Expected "ids": a non-empty list of request ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.approve_batch_max_items:
+            return Response(
+                {'detail': f'At most {self.approve_batch_max_items} requests per batch.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        outcomes = approve_reward_requests(get_access(request).parent_id, request.user.pk, ids)
+        results = [{'id': request_id, 'status': outcome} for request_id, outcome in outcomes.items()]
+        approved = sum(1 for outcome in outcomes.values() if outcome == 'approved')
+        return Response({'approved': approved, 'results': results}, status=status.HTTP_200_OK)
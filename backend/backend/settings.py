@@ -1,6 +1,8 @@
 import os
 from datetime import timedelta
 
+from celery.schedules import crontab
+
 # Add installed apps
 INSTALLED_APPS = [
     # default apps ...
@@ -12,6 +14,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.routing.ReplicaRoutingMiddleware',
     # default middlewares ...
 ]
 
@@ -23,7 +27,7 @@ CORS_ALLOWED_ORIGINS = [
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -35,14 +39,154 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Access tokens carry role, profile and child ids (see api/authentication.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.authentication.ClaimsTokenRefreshSerializer',
+    'TOKEN_USER_CLASS': 'api.authentication.ClaimsUser',
 }
 
+# Reward catalogs and other hot read paths are cached (see api/cache.py).
+# Redis when REDIS_URL is set, process-local memory otherwise (tests, dev).
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+REWARD_CATALOG_CACHE_TIMEOUT = int(os.getenv('REWARD_CATALOG_CACHE_TIMEOUT', str(24 * 60 * 60)))
+# Per-user access sets (visible children/parents, api/access.py); keyed by the
+# user's access_version, so this only bounds memory. 0 resolves per request.
+ACCESS_CONTEXT_CACHE_TIMEOUT = int(os.getenv('ACCESS_CONTEXT_CACHE_TIMEOUT', '60'))
+
 # Auth user model
 AUTH_USER_MODEL = 'api.User'
 
-# Database settings, other settings ...
+# Database: PostgreSQL when POSTGRES_HOST is set, SQLite otherwise (tests, dev).
+# The web process is served through ASGI (Dockerfile), where Django cannot
+# reuse connections across requests, so DB_CONN_MAX_AGE defaults to 0: put
+# PgBouncer (pool_mode=transaction) in front of Postgres and point
+# POSTGRES_HOST/POSTGRES_REPLICA_HOSTS at it to keep connects cheap. WSGI
+# servers and Celery workers may set DB_CONN_MAX_AGE to keep connections
+# open that many seconds per thread; they are health-checked before reuse.
+# POSTGRES_REPLICA_HOSTS (comma-separated host[:port]) adds streaming
+# replicas; api/routing.py sends the viewsets' list/retrieve reads there.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '0'))
+
+
+def _postgres(address):
+    host, _, port = address.strip().partition(':')
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('POSTGRES_DB', 'appdb'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': host,
+        'PORT': port or '5432',
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5'))},
+    }
+
+
+if os.getenv('POSTGRES_HOST'):
+    DATABASES = {'default': _postgres(f"{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT', '5432')}")}
+    for index, address in enumerate(filter(None, os.getenv('POSTGRES_REPLICA_HOSTS', '').split(','))):
+        # Tests run against the primary alone
+        DATABASES[f'replica_{index}'] = {**_postgres(address), 'TEST': {'MIRROR': 'default'}}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        },
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.routing.PrimaryReplicaRouter']
+# Upper bound on replication lag: how long a user who wrote, or data whose
+# change version moved, is read from the primary.
+DATABASE_REPLICA_LAG_SECONDS = float(os.getenv('DATABASE_REPLICA_LAG_SECONDS', '5'))
+
+# Other settings ...
 
 
 CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'compact-ledger': {
+        'task': 'api.tasks.compact_ledger',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'nightly-reminders': {
+        'task': 'api.tasks.fan_out_reminders',
+        'schedule': crontab(hour=18, minute=0),
+    },
+}
+
+# Reminder emails: recipients per task / SMTP connection, and the optional
+# per-parent daily digest of pending requests and point changes.
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', '500'))
+REMINDER_DEFAULT_TASK = os.getenv('REMINDER_DEFAULT_TASK', "today's chores")
+REMINDER_FROM_EMAIL = os.getenv('REMINDER_FROM_EMAIL', 'noreply@yourapp.com')
+REMINDER_DIGEST_ENABLED = os.getenv('REMINDER_DIGEST_ENABLED', 'False') == 'True'
+if REMINDER_DIGEST_ENABLED:
+    CELERY_BEAT_SCHEDULE['parent-digests'] = {
+        'task': 'api.tasks.fan_out_parent_digests',
+        'schedule': crontab(hour=19, minute=0),
+    }
+
+# Score transactions older than this are moved to the archive table by
+# api.tasks.compact_ledger, leaving a per-child LedgerCheckpoint behind.
+LEDGER_RETENTION_DAYS = int(os.getenv('LEDGER_RETENTION_DAYS', '365'))
+
+# Attempts for a reward redemption/approval that hits a lock timeout,
+# deadlock or serialization failure (see api.ledger).
+REDEMPTION_MAX_RETRIES = int(os.getenv('REDEMPTION_MAX_RETRIES', '3'))
+
+# Live update events (api/events.py). Redis pub/sub fans out across worker
+# processes; the in-process broker only reaches streams in the same process.
+EVENTS_REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+EVENTS_BROKER = 'api.events.RedisBroker' if os.getenv('REDIS_URL') else 'api.events.InProcessBroker'
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_STREAM_MAX_SECONDS = int(os.getenv('EVENTS_STREAM_MAX_SECONDS', '300'))
+
+# Write-behind award ingestion (api/ingest.py): score-transactions/ingest/
+# buffers awards, api.tasks.flush_score_ingest writes them in batches.
+INGEST_REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+INGEST_BUFFER = 'api.ingest.RedisIngestBuffer' if os.getenv('REDIS_URL') else 'api.ingest.InProcessIngestBuffer'
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '1000'))
+INGEST_FLUSH_SECONDS = float(os.getenv('INGEST_FLUSH_SECONDS', '2'))
+INGEST_LOCK_SECONDS = 60
+CELERY_BEAT_SCHEDULE['flush-score-ingest'] = {
+    'task': 'api.tasks.flush_score_ingest',
+    'schedule': INGEST_FLUSH_SECONDS,
+}
+
+# Sibling leaderboards (api/leaderboards.py): a Redis sorted set per parent
+# group, or per-process boards without Redis.
+LEADERBOARD_REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+LEADERBOARD_BACKEND = (
+    'api.leaderboards.RedisLeaderboards' if os.getenv('REDIS_URL') else 'api.leaderboards.InProcessLeaderboards'
+)
+
+# Bulk imports (api/imports.py): rows per committed batch and password
+# hashing workers.
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+IMPORT_HASH_WORKERS = int(os.getenv('IMPORT_HASH_WORKERS', str(os.cpu_count() or 1)))
+
+# Request profiling (api/profiling.py): latency for every request; queries,
+# DB and serializer time plus a Server-Timing header for a sampled share.
+# /metrics/ serves them to Prometheus behind `Bearer METRICS_TOKEN`; it
+# refuses every scrape while METRICS_TOKEN is unset.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'True') == 'True'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0.01'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
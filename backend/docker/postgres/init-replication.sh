@@ -0,0 +1,10 @@
+#!/bin/sh
+# Runs once, when the primary's data directory is initialized: a role the
+# replica streams WAL as, and a pg_hba entry letting it connect for that.
+set -e
+
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-EOSQL
+	CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD '${REPLICATION_PASSWORD}';
+EOSQL
+
+echo "host replication replicator all scram-sha-256" >> "$PGDATA/pg_hba.conf"
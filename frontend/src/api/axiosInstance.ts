@@ -49,4 +49,21 @@ axiosInstance.interceptors.request.use(
   error => Promise.reject(error)
 );
 
+// Access tokens carry the user's family links and are rejected once those
+// change; fetch a fresh one with the refresh token and retry once.
+axiosInstance.interceptors.response.use(
+  response => response,
+  async error => {
+    const original = error.config;
+    const refresh = localStorage.getItem('refresh_token');
+    if (error.response?.status === 401 && refresh && original && !original._retried && !original.url?.startsWith('api/token/')) {
+      original._retried = true;
+      const { data } = await axiosInstance.post('api/token/refresh/', { refresh });
+      localStorage.setItem('access_token', data.access);
+      return axiosInstance(original);
+    }
+    return Promise.reject(error);
+  }
+);
+
 export default axiosInstance;
@@ -22,31 +22,20 @@ const ChildDashboard: React.FC = () => {
   const [selectedRewardId, setSelectedRewardId] = useState<number | null>(null);
 
   useEffect(() => {
-    fetchScore();
-    fetchTransactions();
-    fetchRewards();
+    fetchDashboard();
   }, []);
 
-  const fetchScore = () => {
-    axiosInstance.get('children/')
+  // Balance, recent transactions and the reward catalog in one round-trip
+  const fetchDashboard = () => {
+    axiosInstance.get('dashboard/', { params: { recent: 50 } })
       .then(res => {
-        if (res.data.length > 0) {
-          setScoreBalance(res.data[0].score_balance);
+        if (res.data.children.length > 0) {
+          setScoreBalance(res.data.children[0].score_balance);
         }
+        setTransactions(res.data.recent_transactions);
+        setRewards(res.data.rewards);
       })
-      .catch(() => alert('Failed to fetch score'));
-  };
-
-  const fetchTransactions = () => {
-    axiosInstance.get('score-transactions/')
-      .then(res => setTransactions(res.data))
-      .catch(() => alert('Failed to fetch transactions'));
-  };
-
-  const fetchRewards = () => {
-    axiosInstance.get('rewards/')
-      .then(res => setRewards(res.data))
-      .catch(() => alert('Failed to fetch rewards'));
+      .catch(() => alert('Failed to fetch dashboard'));
   };
 
   const handleRequestReward = async (e: React.FormEvent) => {
@@ -69,8 +58,7 @@ const ChildDashboard: React.FC = () => {
     try {
       await axiosInstance.post('rewards/redeem/', { reward_id: selectedRewardId });
       alert('Reward redeemed!');
-      fetchScore();
-      fetchTransactions();
+      fetchDashboard();
       setSelectedRewardId(null);
     } catch (e: any) {
       alert(e.response?.data.detail || 'Failed to redeem reward');
@@ -30,27 +30,18 @@ const ParentDashboard: React.FC = () => {
   const [rewardRequests, setRewardRequests] = useState<RewardRequest[]>([]);
 
   useEffect(() => {
-    fetchChildren();
-    fetchRewards();
-    fetchRewardRequests();
+    fetchDashboard();
   }, []);
 
-  const fetchChildren = () => {
-    axiosInstance.get('children/')
-      .then(res => setChildren(res.data))
-      .catch(() => alert('Failed to fetch children'));
-  };
-
-  const fetchRewards = () => {
-    axiosInstance.get('rewards/')
-      .then(res => setRewards(res.data))
-      .catch(() => alert('Failed to fetch rewards'));
-  };
-
-  const fetchRewardRequests = () => {
-    axiosInstance.get('reward-requests/')
-      .then(res => setRewardRequests(res.data))
-      .catch(() => alert('Failed to fetch reward requests'));
+  // Children, pending requests and the reward catalog in one round-trip
+  const fetchDashboard = () => {
+    axiosInstance.get('dashboard/')
+      .then(res => {
+        setChildren(res.data.children);
+        setRewardRequests(res.data.pending_requests);
+        setRewards(res.data.rewards);
+      })
+      .catch(() => alert('Failed to fetch dashboard'));
   };
 
   const handleAddSubtractPoints = async (e: React.FormEvent) => {
@@ -66,7 +57,7 @@ const ParentDashboard: React.FC = () => {
       alert('Score updated');
       setPoints(0);
       setDescription('');
-      fetchChildren();
+      fetchDashboard();
     } catch {
       alert('Failed to update score');
     }
@@ -76,8 +67,7 @@ const ParentDashboard: React.FC = () => {
     try {
       await axiosInstance.post(`reward-requests/${id}/approve/`);
       alert('Request approved');
-      fetchChildren();
-      fetchRewardRequests();
+      fetchDashboard();
     } catch (e: any) {
       alert(e.response?.data.detail || 'Failed to approve request');
     }